@@ -0,0 +1,136 @@
+import os
+import csv
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from ply_tools import to_shared, free_shared
+from polyhedron_classifier import polyhedron_classifier
+from voxel_grid import voxel_classifier
+from sounding_classifier import raw_vars, chunk_size, read_rows, classify_chunks
+from valsson_2025_model_restore_coords import files_in_folder
+
+'''
+    Batch classification of a directory of CPTu soundings in a process pool
+
+    The CPTu sheets (.xlsm, see copy_files.py) are read through VBA, so the runner takes their
+    exports: one .csv per sounding with a header row holding at least the columns
+    D, QT, FS, U2, U0, Sig_V, Sig_V_eff (kPa).  Empty cells are read as nan (classified -1).
+
+    The parent loads the voxel grid and the BVHs of the 11 models once and copies them to
+    shared memory.  The workers attach to those blocks in their initializer, so no worker
+    reads a PLY or cache file.  Results are collected in file order and written as one
+    columnar .npz: file_index (into files), D, percentage.
+
+    usage:
+        run_batch( 'CPTu_lab_exports', 'sensitivity_log.npz' )
+'''
+
+worker = {} # per process: classifier and the shared memory blocks it views
+
+
+def share_arrays( arrays, created ):
+    # dict of arrays -> dict of shared memory specs (see ply_tools.to_shared), each spec is also
+    # appended to created as soon as its block exists, so a failure part way still frees them all
+    specs = {}
+    for key, arr in arrays.items():
+        specs[key] = to_shared( arr )
+        created.append( specs[key] )
+    return specs
+
+
+def attach_arrays( specs, shms ):
+    # dict of specs -> dict of arrays viewing the shared blocks, shms keeps the blocks open
+    arrays = {}
+    for key, (name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory( name=name )
+        shms.append( shm )
+        arrays[key] = np.ndarray( shape, dtype=dtype, buffer=shm.buf )
+    return arrays
+
+
+def share_classifier( classifier, created ):
+    # voxel_classifier -> picklable spec for init_worker(), blocks listed in created (free with ply_tools.free_shared)
+    return {
+        'logs': classifier.classifier.logs,
+        'models': classifier.classifier.models,
+        'bvhs': [ share_arrays( bvh, created ) for bvh in classifier.classifier.bvhs ],
+        'grid': share_arrays( {'grid': np.asarray(classifier.grid)}, created ),
+        'lims': classifier.lims,
+        }
+
+
+def init_worker( spec ):
+    shms = []
+    bvhs = [ attach_arrays( specs, shms ) for specs in spec['bvhs'] ]
+    grid = attach_arrays( spec['grid'], shms )['grid']
+
+    classifier = polyhedron_classifier( logs=spec['logs'], models=spec['models'], bvhs=bvhs )
+    worker['classifier'] = voxel_classifier( classifier=classifier, grid=grid, lims=spec['lims'] )
+    worker['shms'] = shms
+
+
+def read_sounding_csv( f_name, delimiter=',', chunk_size=chunk_size ):
+    # yields column chunks of raw_vars (see sounding_classifier.read_rows)
+    with open( f_name, newline='' ) as f:
+        reader = csv.reader( f, delimiter=delimiter )
+        header = [ h.strip() for h in next( reader ) ]
+        missing = [ var for var in raw_vars if var not in header ]
+        if missing: raise ValueError( f_name + ': missing columns ' + ', '.join(missing) )
+
+        cols = [ header.index( var ) for var in raw_vars ]
+        rows = ( [ row[i].strip() or 'nan' for i in cols ] for row in reader if row )
+        yield from read_rows( rows, chunk_size )
+
+
+def classify_file( f_name ):
+    t0 = time.perf_counter()
+    depths, percentages = [ np.empty(0) ], [ np.empty(0, dtype=np.int8) ]
+    for d, p in classify_chunks( read_sounding_csv(f_name), worker['classifier'] ):
+        depths.append( d )
+        percentages.append( p.astype(np.int8) )
+    return np.concatenate( depths ), np.concatenate( percentages ), os.getpid(), time.perf_counter()-t0
+
+
+def write_columns( out_path, files, results ):
+    lengths = [ len(r[0]) for r in results ]
+    np.savez(
+        out_path,
+        files=np.array( files ),
+        file_index=np.repeat( np.arange(len(files), dtype=np.int32), lengths ),
+        D=np.concatenate( [ r[0] for r in results ] + [np.empty(0)] ),
+        percentage=np.concatenate( [ r[1] for r in results ] + [np.empty(0, dtype=np.int8)] ),
+        )
+
+
+def report( results, wall ):
+    n = sum( len(r[0]) for r in results )
+    print( str(len(results)) + ' soundings, ' + str(n) + ' readings in ' + str(round(wall, 2)) + ' s: ' + str(int(n/wall)) + ' readings/s' )
+
+    for pid in sorted( set( r[2] for r in results ) ):
+        mine = [ r for r in results if r[2] == pid ]
+        n_pid, t_pid = sum( len(r[0]) for r in mine ), sum( r[3] for r in mine )
+        print( '  worker {:>7}: {:>5} files {:>10} readings {:>8.2f} s busy {:>10} readings/s'.format( pid, len(mine), n_pid, t_pid, int(n_pid/t_pid) if t_pid else 0 ) )
+
+
+def run_batch( in_dir, out_path='sensitivity_log.npz', workers=None, filetype='.csv' ):
+    files = sorted( files_in_folder( in_dir, filetype=filetype ) )
+
+    t0 = time.perf_counter()
+    created = []
+    try:
+        spec = share_classifier( voxel_classifier(), created )
+        with ProcessPoolExecutor( workers, initializer=init_worker, initargs=(spec,) ) as ex:
+            results = list( ex.map( classify_file, files ) )
+    finally:
+        free_shared( created )
+    wall = time.perf_counter()-t0
+
+    write_columns( out_path, files, results )
+    report( results, wall )
+    return results
+
+
+if __name__=='__main__':
+    run_batch( 'CPTu_lab_exports' )
@@ -1,80 +1,450 @@
 import os
+import json
+import shutil
+import hashlib
 import numpy as np
-import pickle
 from scipy.stats import gaussian_kde
+from scipy.spatial import cKDTree
+from scipy.linalg import solve_triangular
+from scipy.fft import rfftn, irfftn, next_fast_len
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
 
 from study_visualizer import visualize, draw_pt_boundaries
 from study_loader import study_loader as loader
-from plyfile import PlyData, PlyElement
+from plyfile import PlyData, PlyElement, PlyChunkWriter
 
 
 # Scripts to define KDE mdoels for the CPTu sensitivity study.
 
+chunk_points = 1 << 18 # grid points evaluated at a time by gen_kdes()
+kde_cutoff = 5. # truncated_kde radius, in bandwidths (Mahalanobis distance)
+default_lims = [[-10,10],[-10,10],[-10,10]]
+kde_backends = ( 'exact', 'truncated', 'binned' ) # see gen_kdes()
+binned_memory_limit = 1 << 30 # bytes of working memory of binned_kde_grid(), see binned_bytes()
+kde_cache_folder = os.path.join( 'saves', 'kde_cache' )
+kde_cache_limit = 4 << 30 # bytes of density grids kept, least recently used entries are evicted
+kde_worker = {} # per process: kernels, grid axes and the density grids written to
+
 
 def get_mgrids( mgrid_def ):
     xmin, xmax, ymin, ymax, zmin, zmax, n_pts = mgrid_def
     return np.mgrid[ xmin:xmax:(n_pts*1j), ymin:ymax:(n_pts*1j), zmin:zmax:(n_pts*1j) ]
 
 
-def gen_kdes( dataset, N=10, lims=[[-10,10],[-10,10],[-10,10]] ):
+def get_axes( mgrid_def ):
+    # grid axes, identical to the get_mgrids() coordinates
+    xmin, xmax, ymin, ymax, zmin, zmax, n_pts = mgrid_def
+    return np.mgrid[ xmin:xmax:(n_pts*1j) ], np.mgrid[ ymin:ymax:(n_pts*1j) ], np.mgrid[ zmin:zmax:(n_pts*1j) ]
+
+
+def slab_positions( axes, slab_idx ):
+    # 3xk positions of the x-slices slab_idx of the grid
+    x, y, z = axes
+    X, Y, Z = np.broadcast_arrays( x[ slab_idx, None, None ], y[ None, :, None ], z[ None, None, : ] )
+    return np.vstack([X.ravel(), Y.ravel(), Z.ravel()])
+
+
+def gen_slab_positions( mgrid_def, slab ):
+    # yields (x index range, 3xk positions) of slab x-slices of the grid at a time
+    axes = get_axes( mgrid_def )
+    n_pts = mgrid_def[6]
+    for i in range( 0, n_pts, slab ):
+        slab_idx = slice( i, min(i+slab, n_pts) )
+        yield slab_idx, slab_positions( axes, slab_idx )
+
+
+def eval_grid( kernel, mgrid_def, out=None, chunk_points=chunk_points ):
+    # kernel evaluated on the grid in x-slabs of ~chunk_points points, written to out (array or memmap)
+    n_pts = mgrid_def[6]
+    if out is None: out = np.empty( (n_pts, n_pts, n_pts) )
+    slab = max( 1, chunk_points // (n_pts*n_pts) )
+
+    for slab_idx, positions in gen_slab_positions( mgrid_def, slab ):
+        out[ slab_idx ] = np.reshape( kernel(positions).T, (-1, n_pts, n_pts) )
+    return out
+
+
+class truncated_kde():
+    # gaussian_kde( positions ) summing only the samples within cutoff bandwidths of each position.
+    # Same Scott bandwidth and covariance as the kernel: positions and samples are whitened with the
+    # Cholesky factor L of kernel.covariance, so the kernels are unit Gaussians, and pairs closer than
+    # cutoff are found with KD-trees.  Every dropped term is below exp(-cutoff^2/2) of a kernel's peak,
+    # so the absolute error is at most exp(-cutoff^2/2) / sqrt(det(2 pi covariance)) (weights sum to
+    # 1); 3.7e-6 of the kernel peak for the default cutoff of 5.
+    def __init__( self, kernel, cutoff=kde_cutoff ):
+        self.cutoff = cutoff
+        self.cho = np.linalg.cholesky( kernel.covariance )
+        self.norm = (2*np.pi)**(kernel.d/2) * np.prod( np.diag(self.cho) )
+        self.weights = kernel.weights
+        self.tree = cKDTree( self.whiten( kernel.dataset ) )
+
+
+    def whiten( self, points ):
+        return solve_triangular( self.cho, points, lower=True ).T
+
+
+    def __call__( self, positions ):
+        positions = np.atleast_2d( positions )
+        pairs = cKDTree( self.whiten( positions ) ).sparse_distance_matrix( self.tree, self.cutoff, output_type='coo_matrix' )
+        contrib = np.exp( -0.5*pairs.data**2 ) * self.weights[ pairs.col ]
+        return np.bincount( pairs.row, weights=contrib, minlength=positions.shape[1] ) / self.norm
+
+
+def bin_tile( i0, f, w, start, tile ):
+    # linear binning of the samples (cells i0, fractions f, weights w) into the block start:start+tile of the padded grid
+    binned = np.zeros( tile )
+    start, tile = np.array( start ), np.array( tile )
+    near = np.all( (i0 >= start-1) & (i0 < start+tile), axis=1 )
+    cells, f, w = i0[near] - start, f[near], w[near]
+    for corner in np.ndindex( 2, 2, 2 ):
+        c = np.array( corner )
+        inside = np.all( (cells + c >= 0) & (cells + c < tile), axis=1 )
+        corner_w = w[inside] * np.prod( np.where( c, f[inside], 1-f[inside] ), axis=1 )
+        np.add.at( binned.reshape(-1), np.ravel_multi_index( (cells[inside] + c).T, binned.shape ), corner_w )
+    return binned
+
+
+def binned_bytes( tile, reach, n_samples ):
+    # peak bytes of binned_kde_grid() with blocks of tile cells: the FFT shape holds a block plus twice
+    # the kernel reach; the kernel and block spectra, the real FFT input and output at that shape,
+    # the binned block, the kernel sampling temporaries and the samples (out is not counted)
+    fshape = [ next_fast_len( t + 2*r, True ) for t, r in zip( tile, reach ) ]
+    spectrum = 16 * fshape[0] * fshape[1] * (fshape[2]//2 + 1)
+    real = 8 * fshape[0] * fshape[1] * fshape[2]
+    kernel = 8 * int( np.prod( 2*np.asarray(reach) + 1 ) )
+    fft = 2*spectrum + 2*real + 8*int( np.prod(tile) )
+    return max( fft, 6*kernel + real + spectrum ) + 200*n_samples
+
+
+def binned_tile( reach, shape, n_samples, memory_limit ):
+    # largest block, in proportion to the kernel extent, whose binned_bytes() fit memory_limit
+    def tile( s ):
+        return [ min( p, max( 1, int( s*(2*r+1) ) ) ) for r, p in zip( reach, shape ) ]
+    lo, hi = 0., float( max(shape) )
+    if binned_bytes( tile(lo), reach, n_samples ) > memory_limit: return None
+    for _ in range( 50 ):
+        mid = (lo + hi) / 2
+        if binned_bytes( tile(mid), reach, n_samples ) <= memory_limit: lo = mid
+        else: hi = mid
+    return tile( lo )
+
+
+def binned_kde_grid( kernel, mgrid_def, out=None, cutoff=kde_cutoff, memory_limit=binned_memory_limit ):
+    # gaussian_kde( grid ) by linear binning of the samples onto the grid and FFT convolution with the
+    # kernel sampled at the grid offsets, cost O(N^3 log N) independent of the sample count.
+    # The kernel uses the full covariance of gaussian_kde, truncated at cutoff bandwidths (Mahalanobis);
+    # the grid is padded by the kernel reach, so samples outside lims still contribute.  Binning moves
+    # each sample by less than a grid spacing, the error falls off as spacing^2 relative to the bandwidth.
+    # The convolution is overlap-add over blocks of the padded grid, binned one block at a time and sized
+    # by binned_bytes() so the working memory besides out stays within memory_limit; raises ValueError
+    # if even a single cell block (one kernel FFT) does not fit
+    xmin, xmax, ymin, ymax, zmin, zmax, n_pts = mgrid_def
+    lo, hi = np.array( [xmin, ymin, zmin], dtype=np.float64 ), np.array( [xmax, ymax, zmax], dtype=np.float64 )
+    h = (hi - lo) / (n_pts - 1)
+    reach = np.ceil( cutoff*np.sqrt(np.diag(kernel.covariance)) / h ).astype( np.int64 ).tolist() # kernel half width in cells
+    shape = [ n_pts + 2*r for r in reach ]
+
+    tile = binned_tile( reach, shape, kernel.n, memory_limit )
+    if tile is None:
+        raise ValueError( 'binned KDE at N=' + str(n_pts) + ' needs ' + str( round( binned_bytes( [1, 1, 1], reach, kernel.n ) / 2**20 ) ) +
+                          ' MB, above memory_limit (' + str( round( memory_limit / 2**20 ) ) + ' MB); raise it or use backend=\'truncated\'' )
+    fshape = [ next_fast_len( t + 2*r, True ) for t, r in zip( tile, reach ) ]
+
+    # sample cells on the padded grid
+    u = (kernel.dataset.T - (lo - np.array(reach)*h)) / h
+    i0 = np.floor( u ).astype( np.int64 )
+    f = u - i0
+    keep = np.all( (i0 >= 0) & (i0 < np.array(shape)-1), axis=1 )
+    i0, f, w = i0[keep], f[keep], kernel.weights[keep]
+
+    # kernel on the grid offsets, full covariance, as a spectrum at the block FFT shape
+    dx, dy, dz = np.ix_( *[ np.arange(-r, r+1)*step for r, step in zip(reach, h) ] )
+    inv = np.linalg.inv( kernel.covariance )
+    quad = inv[0,0]*dx*dx + inv[1,1]*dy*dy + inv[2,2]*dz*dz + 2*(inv[0,1]*dx*dy + inv[0,2]*dx*dz + inv[1,2]*dy*dz)
+    kernel_grid = np.exp( -0.5*quad )
+    kernel_grid[ quad > cutoff**2 ] = 0
+    kernel_grid /= np.sqrt( np.linalg.det( 2*np.pi*kernel.covariance ) )
+    del quad
+    kernel_spectrum = rfftn( kernel_grid, fshape )
+    del kernel_grid
+
+    # overlap-add: the convolution of block start:start+tile covers padded cells start-reach:start+tile+reach
+    if out is None: out = np.empty( (n_pts, n_pts, n_pts) )
+    out[...] = 0
+    for start in np.ndindex( *[ -(-p // t) for p, t in zip( shape, tile ) ] ):
+        start = [ i*t for i, t in zip( start, tile ) ]
+        size = [ min( t, p-a ) for t, p, a in zip( tile, shape, start ) ]
+        binned = bin_tile( i0, f, w, start, size )
+        if not binned.any(): continue
+        spectrum = rfftn( binned, fshape )
+        del binned
+        spectrum *= kernel_spectrum
+        block = irfftn( spectrum, fshape, overwrite_x=True )
+        del spectrum
+
+        src, dst = [], []
+        for a, t, r in zip( start, size, reach ):
+            p0, p1 = max( a-r, r ), min( a+t+r, r+n_pts ) # padded cells inside the grid
+            src.append( slice( p0-(a-r), p1-(a-r) ) )
+            dst.append( slice( p0-r, p1-r ) )
+        if all( s.start < s.stop for s in dst ):
+            np.add( out[ tuple(dst) ], block[ tuple(src) ], out=out[ tuple(dst) ] )
+        del block
+
+    for a in range( 0, n_pts ):
+        np.maximum( out[a], 0, out=out[a] ) # fft round off can go slightly negative
+    return out
+
+
+def new_grid( n_pts, path=None ):
+    # (N,N,N) density grid, an .npy memmap if path is given
+    if path is None: return np.empty( (n_pts, n_pts, n_pts) )
+    return np.lib.format.open_memmap( path, mode='w+', dtype=np.float64, shape=(n_pts, n_pts, n_pts) )
+
+
+def init_kde_worker( kernels, targets, mgrid_def ):
+    # targets per soil group: ('shm', name) or ('npy', path, data offset)
+    n_pts = mgrid_def[6]
+    kde_worker['kernels'] = kernels
+    kde_worker['axes'] = get_axes( mgrid_def )
+    kde_worker['targets'] = targets
+    kde_worker['shms'] = { g: shared_memory.SharedMemory( name=target[1] ) for g, target in enumerate(targets) if target[0] == 'shm' }
+    kde_worker['grids'] = { g: np.ndarray( (n_pts, n_pts, n_pts), dtype=np.float64, buffer=shm.buf ) for g, shm in kde_worker['shms'].items() }
+
+
+def eval_slab( task ):
+    # one work unit: x-slices i0:i1 of the grid of soil group g, written to its shared block or .npy file
+    g, i0, i1 = task
+    positions = slab_positions( kde_worker['axes'], slice(i0, i1) )
+    n_pts = len( kde_worker['axes'][1] )
+    values = np.reshape( kde_worker['kernels'][g](positions).T, (-1, n_pts, n_pts) )
+
+    target = kde_worker['targets'][g]
+    if target[0] == 'shm':
+        kde_worker['grids'][g][ i0:i1 ] = values
+    else: # map only this slab of the file
+        _, path, offset = target
+        slab = np.memmap( path, dtype=np.float64, mode='r+', offset=offset + i0*n_pts*n_pts*8, shape=values.shape )
+        slab[...] = values
+        slab.flush()
+        del slab
+
+
+def eval_grids_parallel( kernels, mgrid_def, paths=None, workers=None, chunk_points=chunk_points ):
+    # as eval_grid() for all kernels, (soil group x slab) work units in a process pool.
+    # with paths the workers write their slabs straight into the .npy memmaps, so memory stays
+    # bounded by the slabs; otherwise into one shared memory grid per soil group, copied out and
+    # freed one grid at a time
+    n_pts = mgrid_def[6]
+    workers = os.cpu_count() if workers is None else workers
+    slab = max( 1, min( chunk_points // (n_pts*n_pts), -(-n_pts*len(kernels) // (4*workers)) ) ) # >= 4 units per worker
+    tasks = [ (g, i, min(i+slab, n_pts)) for g in range(len(kernels)) for i in range(0, n_pts, slab) ]
+
+    if paths is not None:
+        outs = [ new_grid( n_pts, path ) for path in paths ]
+        targets = [ ('npy', path, out.offset) for path, out in zip( paths, outs ) ]
+        with ProcessPoolExecutor( workers, initializer=init_kde_worker, initargs=(kernels, targets, mgrid_def) ) as ex:
+            list( ex.map( eval_slab, tasks ) )
+        return outs
+
+    resource_tracker.ensure_running() # one tracker for all workers, else each reports the blocks as leaked
+    shms = []
+    try:
+        for _ in kernels:
+            shms.append( shared_memory.SharedMemory( create=True, size=8*n_pts**3 ) )
+        targets = [ ('shm', shm.name) for shm in shms ]
+        with ProcessPoolExecutor( workers, initializer=init_kde_worker, initargs=(kernels, targets, mgrid_def) ) as ex:
+            list( ex.map( eval_slab, tasks ) )
+        grids = []
+        while shms:
+            shm = shms.pop( 0 )
+            grids.append( np.array( np.ndarray( (n_pts, n_pts, n_pts), dtype=np.float64, buffer=shm.buf ) ) )
+            shm.close()
+            shm.unlink()
+        return grids
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+def fit_kernel( soil_group, bw_method='scott' ):
+    values = np.vstack( [soil_group['x_trans'], soil_group['y_trans'], soil_group['z_trans']] )
+    return gaussian_kde( values, bw_method ) #, 'silverman' ) # uses scott
+
+
+def check_backend( backend ):
+    if backend not in kde_backends:
+        raise ValueError( 'unknown kde backend ' + repr(backend) + ', expected one of ' + ', '.join(kde_backends) )
+
+
+def gen_kdes( dataset, N=10, lims=default_lims, memmap_dir=None, chunk_points=chunk_points, workers=1, backend='exact', bw_method='scott' ):
+    # densities are evaluated in x-slabs, so peak memory follows chunk_points, not N^3.
+    # with memmap_dir the N^3 grids are written to .npy files there instead of held in memory.
+    # workers > 1 (None: all cores) evaluates (soil group x slab) units in a process pool.
+    # backend: 'exact' (gaussian_kde), 'truncated' (truncated_kde, kde_cutoff bandwidths) or
+    # 'binned' (binned_kde_grid, FFT convolution in blocks within binned_memory_limit, workers do not apply)
+    check_backend( backend )
     n_pts = N #100 goood
-    kdes = []
+    kernels, ids = [], []
+    workers = os.cpu_count() if workers is None else workers
 
     mgrid_def = [ lims[0][0], lims[0][1], lims[1][0], lims[1][1], lims[2][0], lims[2][1], n_pts]
 
-    # grid to be evaluated
-    X, Y, Z = get_mgrids( mgrid_def )
-    positions = np.vstack([X.ravel(), Y.ravel(), Z.ravel()])
+    paths = None
+    if memmap_dir is not None:
+        os.makedirs( memmap_dir, exist_ok=True )
+        paths = []
 
     for soil_group in dataset:
-        values = np.vstack( [soil_group['x_trans'], soil_group['y_trans'], soil_group['z_trans']] )
-
-        kernel = gaussian_kde( values ) #, 'silverman' ) # uses scott
-        D = np.reshape(kernel(positions).T, X.shape)
-        kdes.append ( [kernel, mgrid_def, D, soil_group['id']] )
-
-    return kdes
-
-
-def get_kdes( data_loader, N ):
-    # run times 'without debugging': (0.051*N)^3 sek. N=50->13s, N=150->475s
-    
-    # file name
-    saves_folder = 'saves'
-    save_name = 'kdes_study' + str(data_loader.study_nr) + '_N' + str(N) + '_' + data_loader.var_string + '.pkl'
-    file_path = os.path.join(saves_folder, save_name)
-
-    if not os.path.isfile(file_path):
-        kdes = gen_kdes( data_loader.data(), N=N ) # generate kdes from data
-
-        with open(file_path, 'wb') as f: # save to file
-            pickle.dump( kdes, f)
-    else: # load from save
-        with open( file_path, 'rb' ) as f: 
-            kdes = pickle.load( f )
+        kernels.append( fit_kernel( soil_group, bw_method ) )
+        ids.append( soil_group['id'] )
+        if paths is not None:
+            paths.append( os.path.join( memmap_dir, 'kde_' + str(soil_group['id']) + '_N' + str(n_pts) + '.npy' ) )
+
+    evaluators = [ truncated_kde( kernel ) for kernel in kernels ] if backend == 'truncated' else kernels
+    if backend == 'binned':
+        outs = [ binned_kde_grid( kernel, mgrid_def, new_grid( n_pts, path ) )
+                 for kernel, path in zip( kernels, paths or [None]*len(kernels) ) ]
+    elif workers == 1:
+        outs = [ eval_grid( evaluator, mgrid_def, new_grid( n_pts, path ), chunk_points )
+                 for evaluator, path in zip( evaluators, paths or [None]*len(kernels) ) ]
+    else:
+        outs = eval_grids_parallel( evaluators, mgrid_def, paths, workers, chunk_points )
+
+    return [ [kernel, mgrid_def, D, id] for kernel, D, id in zip( kernels, outs, ids ) ]
+
+
+def report_accuracy( kdes, ref_kdes, base_threshold=0.005 ):
+    # densities of kdes against ref_kdes (e.g. backend='binned' against 'exact'), per soil group
+    for kde, ref in zip( kdes, ref_kdes ):
+        D, D_ref = np.asarray( kde[2] ), np.asarray( ref[2] )
+        err = np.abs( D - D_ref )
+        mask = D_ref > base_threshold
+        rel = err[mask] / D_ref[mask]
+        print( '{}: max abs error {:.3g} (peak {:.3g}), relative error where > {}: median {:.3g}, max {:.3g}'.format(
+            kde[3], err.max(), D_ref.max(), base_threshold, np.median(rel) if rel.size else 0, rel.max() if rel.size else 0 ) )
+
+
+def kde_key( dataset, trans_vals, lims, N, bw_method, backend ):
+    # hash of everything the density grids depend on
+    h = hashlib.sha1( str( (trans_vals, lims, N, bw_method, backend, kde_cutoff if backend != 'exact' else None) ).encode() )
+    for soil_group in dataset:
+        h.update( str(soil_group['id']).encode() )
+        for coord in ['x_trans', 'y_trans', 'z_trans']:
+            h.update( np.ascontiguousarray( soil_group[coord], dtype=np.float64 ).tobytes() )
+    return h.hexdigest()[:16]
+
+
+def cache_entries():
+    # (last use, bytes, path) of the complete kde cache entries, oldest first
+    entries = []
+    if not os.path.isdir( kde_cache_folder ): return entries
+    for name in os.listdir( kde_cache_folder ):
+        path = os.path.join( kde_cache_folder, name )
+        meta = os.path.join( path, 'meta.json' )
+        if not os.path.isfile( meta ): continue # unfinished or foreign
+        size = sum( os.path.getsize( os.path.join(path, f) ) for f in os.listdir(path) )
+        entries.append( (os.path.getmtime(meta), size, path) )
+    return sorted( entries )
+
+
+def evict_kde_cache( keep=None, limit=kde_cache_limit ):
+    # removes least recently used entries until the cache holds at most limit bytes
+    entries = cache_entries()
+    total = sum( size for _, size, _ in entries )
+    for _, size, path in entries:
+        if total <= limit: break
+        if path == keep: continue
+        shutil.rmtree( path )
+        total -= size
+
+
+def release_grids( kdes ):
+    # flushes the memmapped grids of gen_kdes() and returns their file names; no reference to a grid
+    # outlives this call once the caller drops kdes, so the folder can be renamed (Windows refuses
+    # while a file in it is mapped)
+    files = []
+    while kdes:
+        grid = kdes.pop()[2]
+        grid.flush()
+        files.insert( 0, os.path.basename( grid.filename ) )
+    return files
+
+
+def get_kdes( data_loader, N, workers=None, lims=default_lims, backend='exact', bw_method='scott' ):
+    # run times 'without debugging': (0.051*N)^3 sek. N=50->13s, N=150->475s (one core, divide by workers)
+    # densities are cached as .npy files in kde_cache_folder/<key>/, key: kde_key(), and memory-mapped on load.
+    # kernels are refitted from the data, which the key covers.
+    # a callable bw_method is not cached: its repr holds the object address, so no key would ever hit
+    # again; it is evaluated in memory on every call (pass a number or 'scott'/'silverman' to cache)
+    check_backend( backend ) # before it goes into the key and meta.json
+    dataset = data_loader.data()
+    if callable( bw_method ):
+        return gen_kdes( dataset, N=N, lims=lims, workers=workers, backend=backend, bw_method=bw_method )
+    trans_vals = [ [ float(v) for v in data_loader.trans_fact(i) ] for i in range(3) ]
+    key = kde_key( dataset, trans_vals, lims, N, bw_method, backend )
+    entry = os.path.join( kde_cache_folder, key )
+    meta_path = os.path.join( entry, 'meta.json' )
+
+    if not os.path.isfile( meta_path ):
+        tmp = entry + '.tmp'
+        shutil.rmtree( tmp, ignore_errors=True )
+        kdes = gen_kdes( dataset, N=N, lims=lims, memmap_dir=tmp, workers=workers, backend=backend, bw_method=bw_method ) # generate kdes from data
+        ids = [ kde[3] for kde in kdes ]
+        files = release_grids( kdes )
+        del kdes
+
+        meta = {
+            'study_nr': data_loader.study_nr, 'vars': data_loader.var_list, 'trans_vals': trans_vals,
+            'lims': lims, 'N': N, 'backend': backend, 'bw_method': bw_method, 'ids': ids, 'files': files,
+            }
+        with open( os.path.join(tmp, 'meta.json'), 'w' ) as f:
+            json.dump( meta, f )
+        shutil.rmtree( entry, ignore_errors=True )
+        os.replace( tmp, entry )
+        evict_kde_cache( keep=entry )
+
+    # load from cache
+    with open( meta_path ) as f:
+        meta = json.load( f )
+    os.utime( meta_path ) # last use, for evict_kde_cache()
+
+    mgrid_def = [ lims[0][0], lims[0][1], lims[1][0], lims[1][1], lims[2][0], lims[2][1], N ]
+    kdes = []
+    for soil_group, f_name in zip( dataset, meta['files'] ):
+        D = np.load( os.path.join(entry, f_name), mmap_mode='r' )
+        kdes.append( [ fit_kernel( soil_group, bw_method ), mgrid_def, D, soil_group['id'] ] )
     return kdes
 
 
-def gen_pts( kdes, ratio ):
+def gen_slab_pts( kdes, ratio ):
+    # yields gen_pts() results one x-slab of the kde-meshgrids at a time, so the 3xN^3 grid is never built
     threshold = 0.05 # closeness to desired ratio
     base_threshold = 0.005 # minimum value of kde_sum to be included
 
-    # points from kde-meshgrids
-    X, Y, Z = get_mgrids( kdes[0][1] )
-    grid_points = np.vstack([X.ravel(), Y.ravel(), Z.ravel()])
+    x, y, z = get_axes( kdes[0][1] )
+    n_pts = kdes[0][1][6]
 
-    # % of points that are sensitive
-    kde_sum = kdes[0][2] + kdes[1][2]
-    relative_kde = kdes[1][2] / kde_sum # this opreration is central in this study
+    for i in range( n_pts ):
+        # % of points that are sensitive
+        kde_sum = kdes[0][2][i] + kdes[1][2][i]
+        with np.errstate( invalid='ignore', divide='ignore' ): # kde_sum is 0 far from all samples with truncated_kde
+            relative_kde = kdes[1][2][i] / kde_sum # this opreration is central in this study
 
-    # remove points that are >=threshold from volume center && those having little data
-    point_mask = np.logical_and(np.abs(relative_kde.ravel()-ratio)<threshold, kde_sum.ravel() > base_threshold)
-    close_points = grid_points[:, point_mask]
+        # remove points that are >=threshold from volume center && those having little data
+        point_mask = np.logical_and(np.abs(relative_kde-ratio)<threshold, kde_sum > base_threshold)
+        iy, iz = np.nonzero( point_mask )
 
-    return close_points
+        yield np.vstack([ np.full(len(iy), x[i]), y[iy], z[iz] ])
 
 
-def gen_surface_pts( study_nr=0, N=150 ):
+def gen_pts( kdes, ratio ):
+    return np.hstack( list(gen_slab_pts( kdes, ratio )) )
+
+
+def get_surface_kdes( study_nr=0, N=150 ):
     vars = ['BQ','FR','QQT']
     #vars = ['BQ','FSN','QTN']
     
@@ -83,16 +453,24 @@ def gen_surface_pts( study_nr=0, N=150 ):
 
     d_loader.fit( vars )    
 
-    kdes = get_kdes( d_loader, N )
+    return get_kdes( d_loader, N )
+
+
+def surface_ratios():
+    return list(np.arange( 0, 11, 1 )/10)
+
+
+def gen_surface_pts( study_nr=0, N=150 ):
+    kdes = get_surface_kdes( study_nr=study_nr, N=N )
 
     # density based point clouds
     pts = {}
-    for ratio in list(np.arange( 0, 11, 1 )/10):
+    for ratio in surface_ratios():
         pts[ratio] = gen_pts( kdes, ratio )
 
     return pts
 
-def save_point_cloud_to_ply(x, y, z, filename="output.ply"):
+def save_point_cloud_to_ply(x, y, z, filename="output.ply", text=False):
 
     # create structured numpy array to hold points
     points = np.zeros(len(x), dtype=[("x", "f4"), ("y", "f4"), ("z", "f4")])
@@ -104,15 +482,29 @@ def save_point_cloud_to_ply(x, y, z, filename="output.ply"):
     vertex_element = PlyElement.describe(points, "vertex")
 
     # write file
-    PlyData([vertex_element], text=True).write(filename)
+    PlyData([vertex_element], text=text, byte_order='<').write(filename) # binary little endian by default
     print(f"points saved to {filename}")
 
 
-def generate_ply_files( pts ):
-    for key, value in pts.items():
-        x, y, z = value
-        f_name = str(key).replace( '.', '_' ) + '-transformed.ply'
-        save_point_cloud_to_ply( x, y, z, f_name)
+def save_point_cloud_chunks_to_ply( chunks, filename="output.ply", text=False ):
+    # as save_point_cloud_to_ply, for (3,n) point chunks of unknown total count
+    dtype = [("x", "f4"), ("y", "f4"), ("z", "f4")]
+
+    with PlyChunkWriter( filename, dtype, text=text, byte_order='<' ) as writer:
+        for x, y, z in chunks:
+            points = np.zeros(len(x), dtype=dtype)
+            points["x"] = x
+            points["y"] = y
+            points["z"] = z
+            writer.write( points )
+    print(f"points saved to {filename}")
+
+
+def generate_ply_files( kdes ):
+    # points are streamed to file, only one grid slab of one cloud held in memory
+    for ratio in surface_ratios():
+        f_name = str(ratio).replace( '.', '_' ) + '-transformed.ply'
+        save_point_cloud_chunks_to_ply( gen_slab_pts( kdes, ratio ), f_name )
 
 def data_to_ply( study_nr ):
     vars = ['BQ','FR','QQT']
@@ -129,10 +521,10 @@ def data_to_ply( study_nr ):
 
 
 if __name__=='__main__':
-    pts = gen_surface_pts( study_nr=3, N=500 )
+    kdes = get_surface_kdes( study_nr=3, N=500 )
 
     data_to_ply( study_nr=3 )
 
-    generate_ply_files( pts )
-    fig, ax = draw_pt_boundaries( pts[0.5], var_names=vars )
+    generate_ply_files( kdes )
+    fig, ax = draw_pt_boundaries( gen_pts( kdes, 0.5 ), var_names=vars )
     a=1
\ No newline at end of file
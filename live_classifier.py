@@ -0,0 +1,310 @@
+import math
+import numpy as np
+
+from voxel_grid import voxel_classifier, boundary_label
+from sbt_raster import raster_classifier, boundary_label as raster_boundary
+from sbt_classifier import charts
+from sounding_classifier import raw_vars, model_coords
+from mesh_geometry import canonical_edge
+
+'''
+    Online classification of CPTu readings as they arrive from the rigs
+
+    live_classifier loads the voxel grid and BVHs of the 2025 polyhedra and the rasters of the
+    model_defs charts once and keeps them in memory, so one object serves all rigs.  Single
+    readings go through a pure python path (scalar arithmetic and one item lookup per table).
+    Most field readings lie close to the shells, in boundary voxels, so for those the triangles
+    of all models are also bucketed on a column_n^2 grid in (Bq, log Fr): the +z ray test of a
+    reading then runs once against the triangles of its column, with the parity counted per
+    model.  Boundary cells of the charts test the edges of the candidate regions of the
+    sbt_classifier index only.  Small batches use the vectorized classifiers.
+
+    live_sounding holds the state of one rig: running statistics (Welford) of Bq, Fr, Qt and the
+    percentage per layer of layer_thickness meters and for the whole sounding, plus counts of
+    percentages and chart regions, so no statistic is recomputed from the top of the sounding.
+
+    usage:
+        classifier = live_classifier()
+        rig = live_sounding( classifier )
+        percentage, regions = rig.add( d, qt, fs, u2, u0, sig_v, sig_v_eff )
+        rig.add_batch( {'D':..., 'QT':..., ...} )
+        rig.summary()
+'''
+
+stat_vars = [ 'Bq', 'Fr', 'Qt', 'percentage' ]
+layer_thickness = 0.5 # m
+column_n = 64
+
+
+def build_columns( bvhs, n=column_n ):
+    # triangles of all models sorted into n x n columns over their (x, y) extent
+    tris = np.concatenate( [ bvh['tris'] for bvh in bvhs ] )
+    model = np.repeat( np.arange(len(bvhs)), [ len(bvh['tris']) for bvh in bvhs ] )
+    lo, hi = tris[:, :, :2].min( axis=(0, 1) ), tris[:, :, :2].max( axis=(0, 1) )
+    i0 = np.minimum( np.floor( (tris[:, :, :2].min(axis=1) - lo) / (hi - lo) * n ), n-1 ).astype( np.int64 )
+    i1 = np.minimum( np.floor( (tris[:, :, :2].max(axis=1) - lo) / (hi - lo) * n ), n-1 ).astype( np.int64 )
+
+    # expand every box to its columns
+    sizes = i1 - i0 + 1
+    counts = sizes[:, 0] * sizes[:, 1]
+    tri = np.repeat( np.arange(len(tris)), counts )
+    local = np.arange( counts.sum() ) - np.repeat( np.cumsum(counts)-counts, counts )
+    column = (i0[tri, 0] + local % sizes[tri, 0]) * n + i0[tri, 1] + local // sizes[tri, 0]
+
+    order = np.argsort( column, kind='stable' )
+    columns = {
+        'lo': lo.tolist(), 'hi': hi.tolist(), 'n': n, 'n_models': len(bvhs),
+        'offsets': np.searchsorted( column[order], np.arange(n*n+1) ).tolist(),
+        'model': model[ tri[order] ],
+        }
+    columns.update( ray_edges( tris[ tri[order] ] ) )
+    return columns
+
+
+def ray_edges( tris ):
+    # the point independent parts of mesh_geometry.ray_hits(), (m,3) per edge i: corner i -> i+1
+    q0x, q0y, dx, dy, owner = [], [], [], [], []
+    for i in range(3):
+        q0, q1, sign, own = canonical_edge( tris[:, i, :], tris[:, (i+1)%3, :] )
+        q0x.append( q0[:, 0] ), q0y.append( q0[:, 1] ), owner.append( own )
+        dx.append( sign*(q1[:, 0]-q0[:, 0]) ), dy.append( sign*(q1[:, 1]-q0[:, 1]) ) # sign is +-1, so exact
+    edges = { key: np.column_stack( v ) for key, v in zip( ('q0x', 'q0y', 'dx', 'dy', 'owner'), (q0x, q0y, dx, dy, owner) ) }
+    edges['z'] = tris[:, :, 2]
+    return edges
+
+
+def column_inside( columns, point_ ):
+    # models containing one finite point in model coordinates (list of 3 floats), as a bool array
+    idx = []
+    for value, lo, hi in zip( point_, columns['lo'], columns['hi'] ):
+        if not lo <= value <= hi: return np.zeros( columns['n_models'], dtype=bool )
+        idx.append( min( math.floor( (value - lo) / (hi - lo) * columns['n'] ), columns['n']-1 ) )
+
+    column = idx[0] * columns['n'] + idx[1]
+    c = slice( columns['offsets'][column], columns['offsets'][column+1] )
+    x, y, z = point_
+
+    # as mesh_geometry.ray_hits(), same operations so ties are resolved identically
+    e = columns['dx'][c]*(y-columns['q0y'][c]) - columns['dy'][c]*(x-columns['q0x'][c])
+    inside = np.all( (e > 0) | ((e == 0) & columns['owner'][c]), axis=1 )
+    zs = columns['z'][c]
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        z_tri = (e[:, 1]*zs[:, 0] + e[:, 2]*zs[:, 1] + e[:, 0]*zs[:, 2]) / (e[:, 1]+e[:, 2]+e[:, 0])
+    hits = inside & (z_tri > z)
+    return np.bincount( columns['model'][c][hits], minlength=columns['n_models'] ) % 2 == 1
+
+
+class running_stats():
+    # count, mean and sum of squared deviations per variable, nan values are skipped
+    # (plain lists, single readings update them without numpy overhead)
+    def __init__( self, n_vars=len(stat_vars) ):
+        self.n = [0] * n_vars
+        self.mean = [0.] * n_vars
+        self.m2 = [0.] * n_vars
+
+
+    def add( self, values ):
+        # one reading (Welford)
+        for i, value in enumerate( values ):
+            if not math.isfinite( value ): continue
+            self.n[i] += 1
+            delta = value - self.mean[i]
+            self.mean[i] += delta / self.n[i]
+            self.m2[i] += delta * (value - self.mean[i])
+
+
+    def add_batch( self, values ):
+        # (k, n_vars) readings, merged with the pairwise update of Chan et al.
+        values = np.asarray( values, dtype=np.float64 )
+        finite = np.isfinite( values )
+        n_b = finite.sum( axis=0 )
+        with np.errstate( invalid='ignore' ):
+            mean_b = np.where( finite, values, 0 ).sum( axis=0 ) / np.maximum( n_b, 1 )
+            m2_b = np.where( finite, (values - mean_b)**2, 0 ).sum( axis=0 )
+
+        n_a, mean_a = np.array( self.n ), np.array( self.mean )
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self.mean = np.where( n > 0, mean_a + delta * n_b / np.maximum(n, 1), 0 ).tolist()
+        self.m2 = ( np.array(self.m2) + m2_b + np.where( n > 0, delta**2 * n_a * n_b / np.maximum(n, 1), 0 ) ).tolist()
+        self.n = n.tolist()
+
+
+    def std( self ):
+        return [ math.sqrt( m2 / (n - 1) ) if n > 1 else math.nan for n, m2 in zip( self.n, self.m2 ) ]
+
+
+    def summary( self ):
+        std = self.std()
+        return { var: { 'n': self.n[i], 'mean': self.mean[i] if self.n[i] else math.nan, 'std': std[i] }
+                 for i, var in enumerate(stat_vars) }
+
+
+def region_at( prep, x, y ):
+    # as sbt_classifier.classify_native() for one native point
+    index = prep['index']
+    (x_lo, x_hi), (y_lo, y_hi) = index['lims']
+    i = min( max( math.floor( (x - x_lo) / (x_hi - x_lo) * index['n'] ), 0 ), index['n']-1 )
+    j = min( max( math.floor( (y - y_lo) / (y_hi - y_lo) * index['n'] ), 0 ), index['n']-1 )
+
+    for region in np.flatnonzero( index['buckets'][i, j] ).tolist(): # ascending ids
+        box = index['boxes'][region]
+        if not ( box[0] <= x <= box[1] and box[2] <= y <= box[3] ): continue
+        start = prep['starts'][region]
+        stop = prep['starts'][region+1] if region+1 < len(prep['starts']) else len(prep['x0'])
+        x0, y0, y1, slope = [ prep[key][start:stop] for key in ('x0', 'y0', 'y1', 'slope') ]
+        with np.errstate( invalid='ignore' ):
+            if np.count_nonzero( (y0 <= y) & (y < y1) & (x < x0 + (y - y0) * slope) ) % 2: return int( prep['ids'][region] )
+    return 0
+
+
+class live_classifier():
+    def __init__( self, n=128, raster_n=512, names=('robertson_90_bq', 'robertson_90_fr') ):
+        self.voxels = voxel_classifier( n )
+        self.rasters = raster_classifier( raster_n, names )
+        self.columns = build_columns( self.voxels.classifier.bvhs )
+        self.percentages = np.array( self.voxels.classifier.percentages )
+
+        # resident copies of the tables and their limits as plain floats
+        self.grid = np.array( self.voxels.grid )
+        self.n = self.grid.shape[0]
+        self.lims = [ (float(lo), float(hi)) for lo, hi in self.voxels.lims ]
+        self.logs = list( self.voxels.classifier.logs )
+        self.charts = {}
+        for name, (raster, lims) in self.rasters.rasters.items():
+            axes = charts[name]['axes']
+            self.charts[name] = ( axes[0][0], axes[0][1] == 'log', axes[1][0], axes[1][1] == 'log',
+                                  np.array( raster ), [ (float(lo), float(hi)) for lo, hi in lims ] )
+
+
+    def classify_reading( self, qt, fs, u2, u0, sig_v, sig_v_eff ):
+        # one raw reading -> (Bq, Fr, Qt), percentage and {chart: region id}
+        qn = qt - sig_v
+        if qn > 0 and sig_v_eff:
+            coords = ( (u2-u0)/qn, fs/qn*100, qn/sig_v_eff )
+        else:
+            coords = ( math.nan, math.nan, math.nan )
+        return coords, self.percentage( coords ), self.regions( dict( zip( ('Bq', 'Fr', 'Qt'), coords ) ) )
+
+
+    def percentage( self, coords ):
+        point_ = []
+        for value, some_log in zip( coords, self.logs ):
+            if some_log: value = math.log10( value ) if value > 0 else math.nan
+            if not math.isfinite( value ): return -1
+            point_.append( value )
+
+        idx = [ math.floor( (value - lo) / (hi - lo) * self.n ) for value, (lo, hi) in zip( point_, self.lims ) ]
+        if all( 0 <= i < self.n for i in idx ):
+            res = self.grid.item( *idx )
+            if res != boundary_label: return res
+
+        inside = column_inside( self.columns, point_ )
+        return int( self.percentages[inside].max() ) if inside.any() else -1
+
+
+    def regions( self, values ):
+        res = {}
+        for name, (x_name, x_log, y_name, y_log, raster, lims) in self.charts.items():
+            x, y = values[x_name], values[y_name]
+            if x_log: x = math.log10( x ) if x > 0 else math.nan
+            if y_log: y = math.log10( y ) if y > 0 else math.nan
+            if not ( math.isfinite(x) and math.isfinite(y) ):
+                res[name] = 0
+                continue
+
+            n = raster.shape[0]
+            i = math.floor( (x - lims[0][0]) / (lims[0][1] - lims[0][0]) * n )
+            j = math.floor( (y - lims[1][0]) / (lims[1][1] - lims[1][0]) * n )
+            region = raster.item( i, j ) if 0 <= i < n and 0 <= j < n else 0
+            res[name] = region_at( charts[name], x, y ) if region == raster_boundary else region
+        return res
+
+
+    def classify_batch( self, chunk ):
+        # dict of raw_vars columns -> (k,3) coords, percentages and {chart: region ids}
+        coords = model_coords( *[ chunk[var] for var in raw_vars[1:] ] )
+        values = { 'Bq': coords[:, 0], 'Fr': coords[:, 1], 'Qt': coords[:, 2] }
+        return coords, self.voxels.classify_points( coords ), self.rasters.classify_all( values )
+
+
+class live_sounding():
+    def __init__( self, classifier, layer_thickness=layer_thickness ):
+        self.classifier = classifier
+        self.layer_thickness = layer_thickness
+        self.total = running_stats()
+        self.layers = {} # layer index -> running_stats
+        self.percentages = {} # percentage -> count
+        self.regions = { name: {} for name in classifier.charts } # chart -> region id -> count
+        self.depth = math.nan
+
+
+    def layer_at( self, i ):
+        # stats of layer i (depths i*layer_thickness to (i+1)*layer_thickness), keyed by the integer index
+        if i not in self.layers: self.layers[i] = running_stats()
+        return self.layers[i]
+
+
+    def add( self, d, qt, fs, u2, u0, sig_v, sig_v_eff ):
+        coords, percentage, regions = self.classifier.classify_reading( qt, fs, u2, u0, sig_v, sig_v_eff )
+        values = coords + ( percentage if percentage >= 0 else math.nan, )
+        self.total.add( values )
+        self.layer_at( int( d // self.layer_thickness ) ).add( values ) # same floor division as add_batch()
+
+        self.percentages[percentage] = self.percentages.get( percentage, 0 ) + 1
+        for name, region in regions.items():
+            self.regions[name][region] = self.regions[name].get( region, 0 ) + 1
+        self.depth = d
+        return percentage, regions
+
+
+    def add_batch( self, chunk ):
+        coords, percentages, regions = self.classifier.classify_batch( chunk )
+        values = np.column_stack( (coords, np.where( percentages >= 0, percentages, np.nan )) )
+        self.total.add_batch( values )
+
+        layer_idx = np.floor_divide( np.asarray(chunk['D'], dtype=np.float64), self.layer_thickness ).astype( np.int64 )
+        for i in np.unique( layer_idx ).tolist():
+            self.layer_at( i ).add_batch( values[ layer_idx == i ] )
+
+        for value, count in zip( *[ v.tolist() for v in np.unique( percentages, return_counts=True ) ] ):
+            self.percentages[value] = self.percentages.get( value, 0 ) + count
+        for name, ids in regions.items():
+            for value, count in zip( *[ v.tolist() for v in np.unique( ids, return_counts=True ) ] ):
+                self.regions[name][value] = self.regions[name].get( value, 0 ) + count
+        if len( layer_idx ): self.depth = float( chunk['D'][-1] )
+        return percentages, regions
+
+
+    def summary( self ):
+        return {
+            'depth': self.depth,
+            'total': self.total.summary(),
+            'layers': { (i*self.layer_thickness, (i+1)*self.layer_thickness): stats.summary() for i, stats in sorted( self.layers.items() ) },
+            'percentages': dict( sorted( self.percentages.items() ) ),
+            'regions': self.regions,
+            }
+
+
+if __name__=='__main__':
+    import time
+    from studies import STUDY4
+
+    classifier = live_classifier()
+    soil_type = STUDY4[0]
+    readings = list( zip( *[ soil_type[var] for var in raw_vars ] ) )
+
+    rig = live_sounding( classifier )
+    t0 = time.perf_counter()
+    for reading in readings:
+        rig.add( *reading )
+    dt = time.perf_counter() - t0
+    print( str(len(readings)) + ' single readings: ' + str(round( dt/len(readings)*1e6, 1 )) + ' us per reading' )
+
+    batch_rig = live_sounding( classifier )
+    for start in range( 0, len(readings), 10 ):
+        batch_rig.add_batch( { var: np.asarray( soil_type[var][start:start+10], dtype=np.float64 ) for var in raw_vars } )
+
+    print( rig.summary()['total'] )
+    print( batch_rig.summary()['total'] )
+    print( rig.percentages, batch_rig.percentages )
@@ -0,0 +1,184 @@
+import os
+import hashlib
+import numpy as np
+from scipy.spatial import cKDTree
+
+from plyfile import PlyData
+from mesh_geometry import apply_logs, orient_triangles, close_triangle_holes, ray_hits, point_tri_dist
+
+'''
+    Bounding volume hierarchy (AABB tree) over the triangles of a mesh
+
+    The tree is a dict of flat arrays, so it saves to / loads from .npz as is:
+        lo, hi      (k,3) node boxes
+        children    (k,2) child nodes, -1 for leaves
+        ranges      (k,2) [start, end) of the node's triangles in tris
+        tris        (m,3,3) triangle corners, ccw in xy (mesh_geometry.orient_triangles), sorted by leaf
+        edge_on     (m,) triangles with zero xy area, skipped by the ray test
+        faces       (m,) index of each triangle in the original face list
+
+    Queries walk the tree for all points at once: a frontier of (point, node) pairs is pruned
+    against the node boxes level by level, and the leaves reached give the (point, triangle)
+    pairs for the exact mesh_geometry kernels.  A query costs O(log m) nodes per point
+    instead of m triangles.
+
+    get_bvh() builds the tree for a PLY file once and caches it in saves/, keyed on the file
+    contents and the log10 transform.  build_bvh() closes holes of a single missing triangle first.
+'''
+
+leaf_size = 8
+point_block = 1 << 16 # points per traversal, bounds the frontier size
+saves_folder = 'saves'
+
+
+def build_bvh( vertices, faces, leaf_size=leaf_size ):
+    # holes closed as in mesh_geometry.prep_triangles(), so both see the same surface
+    tris, edge_on = orient_triangles( vertices, close_triangle_holes(faces) )
+    lo, hi, centroids = tris.min( axis=1 ), tris.max( axis=1 ), tris.mean( axis=1 )
+    order = np.arange( len(tris) )
+
+    node_lo, node_hi, children, ranges = [], [], [], []
+    def add_node( start, end ):
+        idx = order[ start:end ]
+        node_lo.append( lo[idx].min(axis=0) )
+        node_hi.append( hi[idx].max(axis=0) )
+        children.append( [-1, -1] )
+        ranges.append( [start, end] )
+        return len( ranges )-1
+
+    todo = [ add_node( 0, len(tris) ) ]
+    while todo: # median split on the longest axis of the centroids
+        node = todo.pop()
+        start, end = ranges[ node ]
+        if end-start <= leaf_size: continue
+
+        idx = order[ start:end ]
+        axis = np.argmax( np.ptp( centroids[idx], axis=0 ) )
+        half = (end-start)//2
+        order[ start:end ] = idx[ np.argpartition( centroids[idx, axis], half ) ]
+
+        children[ node ] = [ add_node( start, start+half ), add_node( start+half, end ) ]
+        todo += children[ node ]
+
+    return {
+        'lo': np.array( node_lo ).reshape( -1, 3 ),
+        'hi': np.array( node_hi ).reshape( -1, 3 ),
+        'children': np.array( children, dtype=np.int64 ).reshape( -1, 2 ),
+        'ranges': np.array( ranges, dtype=np.int64 ).reshape( -1, 2 ),
+        'tris': tris[ order ],
+        'edge_on': edge_on[ order ],
+        'faces': order,
+        }
+
+
+def save_bvh( bvh, f_name ):
+    np.savez( f_name, **bvh )
+
+
+def load_bvh( f_name ):
+    with np.load( f_name ) as data:
+        return { key: data[key] for key in data.files }
+
+
+def expand_leaves( bvh, pts_idx, nodes ):
+    # (point, leaf) pairs -> (point, triangle) pairs
+    start, end = bvh['ranges'][ nodes, 0 ], bvh['ranges'][ nodes, 1 ]
+    counts = end-start
+    offsets = np.repeat( start - (np.cumsum(counts)-counts), counts )
+    return np.repeat( pts_idx, counts ), np.arange( counts.sum() ) + offsets
+
+
+def box_dist( points, lo, hi ):
+    # distance from points to boxes, 0 inside
+    return np.linalg.norm( np.maximum( 0, np.maximum(lo-points, points-hi) ), axis=1 )
+
+
+def ray_crossings_bvh( bvh, points ):
+    # as mesh_geometry.ray_crossings(), number of triangles above each point
+    points = np.asarray( points, dtype=np.float64 )
+    counts = np.zeros( len(points), dtype=np.int64 )
+
+    for start in range( 0, len(points), point_block ):
+        p = np.arange( start, min(start+point_block, len(points)) )
+        nodes = np.zeros( len(p), dtype=np.int64 )
+
+        while len( p ):
+            pts, lo, hi = points[p], bvh['lo'][nodes], bvh['hi'][nodes]
+            # z <= hi: ray_hits() can round a triangle top to just above a point on it, keep those nodes
+            hit = (pts[:,0] >= lo[:,0]) & (pts[:,0] <= hi[:,0]) & (pts[:,1] >= lo[:,1]) & (pts[:,1] <= hi[:,1]) & (pts[:,2] <= hi[:,2])
+            p, nodes = p[hit], nodes[hit]
+
+            leaf = bvh['children'][ nodes, 0 ] < 0
+            pi, ti = expand_leaves( bvh, p[leaf], nodes[leaf] )
+            keep = ~bvh['edge_on'][ ti ]
+            pi, ti = pi[keep], ti[keep]
+            with np.errstate( divide='ignore', invalid='ignore' ):
+                hits = ray_hits( points[pi], bvh['tris'][ti] )
+            counts += np.bincount( pi[hits], minlength=len(points) )
+
+            p, nodes = np.repeat( p[~leaf], 2 ), bvh['children'][ nodes[~leaf] ].ravel()
+
+    return counts
+
+
+def points_in_bvh( bvh, points ):
+    return ray_crossings_bvh( bvh, points ) % 2 == 1
+
+
+def update_nearest( bvh, points, pi, ti, best, best_tri ):
+    # lowers best/best_tri with the (point, triangle) pairs pi, ti
+    if len( pi ) == 0: return
+    d = point_tri_dist( points[pi], bvh['tris'][ti] )
+    order = np.lexsort( (d, pi) )
+    first = np.ones( len(order), dtype=bool )
+    first[1:] = pi[order][1:] != pi[order][:-1]
+    pi, ti, d = pi[order][first], ti[order][first], d[order][first]
+
+    better = d < best[pi]
+    best[ pi[better] ] = d[better]
+    best_tri[ pi[better] ] = ti[better]
+
+
+def nearest_surface( bvh, points ):
+    # distance to the closest triangle and its index in the original face list
+    points = np.asarray( points, dtype=np.float64 )
+    best = np.full( len(points), np.inf )
+    best_tri = np.full( len(points), -1, dtype=np.int64 )
+    if len( points ) == 0: return best, best_tri
+    corners = cKDTree( bvh['tris'].reshape(-1, 3) )
+
+    for start in range( 0, len(points), point_block ):
+        p_all = np.arange( start, min(start+point_block, len(points)) )
+
+        # upper bound: distance to the nearest triangle corner
+        best[ p_all ], corner = corners.query( points[p_all] )
+        best_tri[ p_all ] = corner // 3
+
+        # exact: all nodes that can beat the current bound
+        p, nodes = p_all, np.zeros( len(p_all), dtype=np.int64 )
+        while len( p ):
+            near = box_dist( points[p], bvh['lo'][nodes], bvh['hi'][nodes] ) < best[p]
+            p, nodes = p[near], nodes[near]
+
+            leaf = bvh['children'][ nodes, 0 ] < 0
+            update_nearest( bvh, points, *expand_leaves( bvh, p[leaf], nodes[leaf] ), best, best_tri )
+            p, nodes = np.repeat( p[~leaf], 2 ), bvh['children'][ nodes[~leaf] ].ravel()
+
+    return best, np.where( best_tri >= 0, bvh['faces'][best_tri], -1 )
+
+
+def get_bvh( f_name, logs=[False, True, True] ):
+    # BVH of a PLY mesh with log10 applied as in prep_mesh(), built once per file contents
+    with open( f_name, 'rb' ) as f:
+        key = hashlib.sha1( f.read() + str( (logs, leaf_size, 'closed') ).encode() ).hexdigest()[:16]
+    save_name = 'bvh_' + os.path.basename( f_name ).split('.')[0] + '_' + key + '.npz'
+    file_path = os.path.join( saves_folder, save_name )
+
+    if os.path.isfile( file_path ):
+        return load_bvh( file_path )
+
+    vertices, faces, _ = PlyData.read_arrays( f_name )
+    bvh = build_bvh( apply_logs(vertices, logs), faces )
+    os.makedirs( saves_folder, exist_ok=True )
+    save_bvh( bvh, file_path )
+    return bvh
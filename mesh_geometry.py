@@ -0,0 +1,158 @@
+import numpy as np
+
+'''
+    Vectorized geometry kernels for closed triangle meshes (vertices (n,3), faces (m,3)).
+
+    points_in_mesh() casts a ray from each point in +z and counts the triangles it crosses,
+    an odd count means inside.  The test runs on (point, triangle) pairs in blocks, so it is
+    vectorized over both but scales as points x triangles.  ray_hits() and point_tri_dist()
+    work on any broadcastable (point, triangle) pairs, e.g. the candidates of mesh_bvh.
+
+    A point whose ray passes exactly through a shared edge or vertex must be counted once:
+    triangles are made counter-clockwise in the xy-plane and an edge only owns the points on it
+    if it is a 'top-left' edge.  Neighbouring triangles traverse a shared edge in opposite
+    directions, so exactly one of them owns it, and its edge function is evaluated from the
+    same end in both so the two only differ in sign.  Triangles seen edge-on from the ray
+    (zero xy area) are skipped.
+'''
+
+block_size = 1 << 20 # (point, triangle) pairs evaluated at a time
+
+
+def apply_logs( points, logs=[False, True, True] ):
+    # log10 of the flagged axes as in prep_mesh(), non-positive values become -inf/nan
+    points_ = np.array( points, dtype=np.float64, ndmin=2 )
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        for i, some_log in enumerate( logs ):
+            if some_log:
+                points_[:, i] = np.log10( points_[:, i] )
+    return points_
+
+
+def orient_triangles( vertices, faces ):
+    # triangle corners (m,3,3) made counter-clockwise in xy, and a mask of the edge-on ones
+    tris = np.asarray( vertices, dtype=np.float64 )[ np.asarray(faces) ]
+    a, b, c = tris[:, 0], tris[:, 1], tris[:, 2]
+    area = (b[:,0]-a[:,0])*(c[:,1]-a[:,1]) - (b[:,1]-a[:,1])*(c[:,0]-a[:,0])
+
+    cw = area < 0
+    tris[cw] = tris[cw][:, [0, 2, 1]]
+    return tris, area == 0
+
+
+def close_triangle_holes( faces ):
+    # adds a face for each hole bounded by exactly three open edges (050p_a.ply misses one)
+    faces = np.asarray( faces )
+    edges = np.sort( np.concatenate( [faces[:, [0,1]], faces[:, [1,2]], faces[:, [2,0]]] ), axis=1 )
+    uniq, counts = np.unique( edges, axis=0, return_counts=True )
+
+    neighbours = {}
+    for a, b in uniq[ counts == 1 ].tolist():
+        neighbours.setdefault( a, set() ).add( b )
+        neighbours.setdefault( b, set() ).add( a )
+
+    holes = set()
+    for a in neighbours:
+        for b in neighbours[a]:
+            for c in neighbours[a] & neighbours[b]:
+                holes.add( tuple(sorted( (a, b, c) )) )
+
+    if not holes: return faces
+    return np.vstack( (faces, np.array( sorted(holes), dtype=faces.dtype )) )
+
+
+def prep_triangles( vertices, faces ):
+    # triangle corners (m,3,3), counter-clockwise in xy, edge-on triangles dropped, holes closed
+    tris, edge_on = orient_triangles( vertices, close_triangle_holes(faces) )
+    return tris[ ~edge_on ]
+
+
+def edge_owner( p0, p1 ):
+    # top-left rule for ccw triangles: edges going down, or exactly horizontal going left
+    dx, dy = p1[..., 0]-p0[..., 0], p1[..., 1]-p0[..., 1]
+    return (dy < 0) | ((dy == 0) & (dx < 0))
+
+
+def canonical_edge( p0, p1 ):
+    # edge p0->p1 as (q0, q1, sign, owner) with q0 < q1 (sorted on x, y), so that the edge function
+    # of a shared edge is computed from the same end in both triangles and only differs in sign
+    swap = (p0[..., 0] > p1[..., 0]) | ((p0[..., 0] == p1[..., 0]) & (p0[..., 1] > p1[..., 1]))
+    q0 = np.where( swap[..., None], p1, p0 )
+    q1 = np.where( swap[..., None], p0, p1 )
+    return q0, q1, np.where( swap, -1., 1. ), edge_owner( p0, p1 )
+
+
+def ray_hits( points, tris ):
+    # True where the +z ray from points (...,3) crosses tris (...,3,3), shapes broadcast
+    x, y = points[..., 0], points[..., 1]
+    corners = [ tris[..., i, :] for i in range(3) ]
+
+    inside = True
+    weights = []
+    for i in range(3):
+        q0, q1, sign, owner = canonical_edge( corners[i], corners[(i+1)%3] )
+        e = sign*( (q1[..., 0]-q0[..., 0])*(y-q0[..., 1]) - (q1[..., 1]-q0[..., 1])*(x-q0[..., 0]) )
+        inside = inside & ((e > 0) | ((e == 0) & owner))
+        weights.append( e )
+
+    # z of the triangle above (x,y), weights of corner i is the edge opposite to it
+    w_a, w_b, w_c = weights[1], weights[2], weights[0]
+    z_tri = (w_a*corners[0][..., 2] + w_b*corners[1][..., 2] + w_c*corners[2][..., 2]) / (w_a+w_b+w_c)
+
+    return inside & (z_tri > points[..., 2])
+
+
+def ray_crossings( points, tris ):
+    # number of triangles above each point (m triangles from prep_triangles), as int array
+    points = np.asarray( points, dtype=np.float64 )
+    counts = np.zeros( len(points), dtype=np.int64 )
+    if len( tris ) == 0: return counts
+
+    step = max( 1, block_size//len(tris) )
+    for start in range( 0, len(points), step ):
+        hits = ray_hits( points[ start:start+step, None, : ], tris[None] ) # (k,1,3) against (1,m,3,3)
+        counts[ start:start+step ] = np.count_nonzero( hits, axis=1 )
+    return counts
+
+
+def points_in_mesh( points, vertices, faces ):
+    # bool array, True for points inside the closed mesh
+    return ray_crossings( points, prep_triangles(vertices, faces) ) % 2 == 1
+
+
+def closest_on_tri( points, tris ):
+    # closest point on tris (...,3,3) to points (...,3), shapes broadcast
+    # Voronoi regions as in Ericson, Real-Time Collision Detection, 5.1.5
+    a, b, c = tris[..., 0, :], tris[..., 1, :], tris[..., 2, :]
+    ab, ac = b-a, c-a
+
+    dot = lambda u, v: np.sum( u*v, axis=-1 )
+    d1, d2 = dot( ab, points-a ), dot( ac, points-a )
+    d3, d4 = dot( ab, points-b ), dot( ac, points-b )
+    d5, d6 = dot( ab, points-c ), dot( ac, points-c )
+    va, vb, vc = d3*d6 - d5*d4, d5*d2 - d1*d6, d1*d4 - d3*d2
+
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        denom = 1/(va+vb+vc)
+        v_ab, w_ac = d1/(d1-d3), d2/(d2-d6)
+        w_bc = (d4-d3)/((d4-d3)+(d5-d6))
+
+    # barycentric (v, w) per region, the first matching region wins, face interior if none
+    regions = [
+        ( (d1 <= 0) & (d2 <= 0), 0., 0. ), # vertex a
+        ( (d3 >= 0) & (d4 <= d3), 1., 0. ), # vertex b
+        ( (d6 >= 0) & (d5 <= d6), 0., 1. ), # vertex c
+        ( (vc <= 0) & (d1 >= 0) & (d3 <= 0), v_ab, 0. ), # edge ab
+        ( (vb <= 0) & (d2 >= 0) & (d6 <= 0), 0., w_ac ), # edge ac
+        ( (va <= 0) & (d4-d3 >= 0) & (d5-d6 >= 0), 1-w_bc, w_bc ), # edge bc
+        ]
+    v, w = vb*denom, vc*denom
+    for mask, v_reg, w_reg in regions[::-1]:
+        v, w = np.where( mask, v_reg, v ), np.where( mask, w_reg, w )
+
+    return a + v[..., None]*ab + w[..., None]*ac
+
+
+def point_tri_dist( points, tris ):
+    # euclidean distance from points (...,3) to tris (...,3,3), shapes broadcast
+    return np.linalg.norm( points - closest_on_tri(points, tris), axis=-1 )
@@ -0,0 +1,240 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+from plyfile import PlyData
+from valsson_2025_model_restore_coords import files_in_folder
+
+'''
+    Tools for the PLY files in the repository.
+
+    The shipped models are ASCII PLY files written with %.18g floats.  convert_tree()
+    rewrites a directory tree to binary little-endian PLY, keeping all header comments
+    (the 'x(Bq) y(Fr) z(Qt)' axis comment read by get_ax_lims() included).
+    With suffix='.gz' (or '.xz', '.bz2', '.zst') the converted files are also compressed.
+    PlyData.read() accepts either format, so the loaders can be pointed at either tree.
+
+    benchmark_load() reports file size and load time for each original/converted pair.
+
+    index_dir() lists the models in a folder from their headers only (name, ratio,
+    axis system, vertex/face counts), so models can be picked before the full parse.
+
+    load_plys() reads a list of files in a thread or process pool, in the given order,
+    with per-file timings.  ASCII parsing holds the GIL, so for ASCII files the process
+    pool is the faster one; its workers hand the arrays back through shared memory
+    instead of pickling them.
+'''
+
+asset_dirs = [ '.', '2025_model_restored', 'PLY_point_cloud_restored' ]
+binary_dir = 'PLY_binary'
+
+
+def convert_ply( in_path, out_path, text=False, byte_order='<' ):
+    ply_data = PlyData.read( in_path, mmap=False ) # comments & obj_info kept in ply_data
+    ply_data.text = text
+    ply_data.byte_order = byte_order
+    ply_data.write( out_path )
+
+
+def convert_tree( in_dir, out_dir, text=False, byte_order='<', recursive=True, suffix='' ):
+    # mirrors the .ply files in in_dir to out_dir, returns list of (in_path, out_path)
+    if recursive:
+        files = files_in_folder( in_dir, filetype='.ply' )
+    else:
+        files = [ os.path.join(in_dir, f) for f in os.listdir( in_dir ) if f.lower().endswith('.ply') ]
+
+    converted = []
+    for in_path in files:
+        out_path = os.path.join( out_dir, os.path.relpath(in_path, in_dir) ) + suffix
+        if os.path.abspath( out_path ) == os.path.abspath( in_path ): continue # never overwrite source
+
+        os.makedirs( os.path.dirname(out_path), exist_ok=True )
+        convert_ply( in_path, out_path, text=text, byte_order=byte_order )
+        converted.append( (in_path, out_path) )
+    return converted
+
+
+def load_time( f_name, repeat=5 ):
+    # best of repeat, as used by the prep functions
+    best = float('inf')
+    for _ in range( repeat ):
+        t0 = time.perf_counter()
+        PlyData.read_arrays( f_name )
+        best = min( best, time.perf_counter()-t0 )
+    return best
+
+
+def benchmark_load( pairs, repeat=5 ):
+    res = []
+    header = '{:<45} {:>10} {:>10} {:>10} {:>10} {:>8}'.format( 'file', 'kB (txt)', 'kB (bin)', 'ms (txt)', 'ms (bin)', 'saved' )
+    print( header )
+    print( '-'*len(header) )
+
+    for txt_path, bin_path in pairs:
+        t_txt, t_bin = load_time( txt_path, repeat ), load_time( bin_path, repeat )
+        s_txt, s_bin = os.path.getsize( txt_path ), os.path.getsize( bin_path )
+        res.append( (txt_path, s_txt, s_bin, t_txt, t_bin) )
+
+        saved = str( round((1-t_bin/t_txt)*100, 1) ) + '%'
+        print( '{:<45} {:>10.1f} {:>10.1f} {:>10.2f} {:>10.2f} {:>8}'.format( txt_path, s_txt/1e3, s_bin/1e3, t_txt*1e3, t_bin*1e3, saved ) )
+
+    tot_txt, tot_bin = sum( r[3] for r in res ), sum( r[4] for r in res )
+    if res: print( 'total: ' + str(round(tot_txt*1e3,1)) + ' ms -> ' + str(round(tot_bin*1e3,1)) + ' ms' )
+    return res
+
+
+def model_ratio( f_name ):
+    # '080p_a.ply' -> 0.8 (2025 models), '1_00.ply' -> 1.0 (point clouds), else None
+    name = os.path.splitext( os.path.basename(f_name) )[0]
+    try:
+        if 'p_' in name: return float( name.split('p_')[0] )/100
+        if '_' in name: return float( name.replace('_', '.') )
+    except ValueError:
+        pass
+    return None
+
+
+def axis_system( comments ):
+    # axis comment as read by get_ax_lims(), e.g. 'x(Bq) y(Fr) z(Qt)'
+    for comment in comments:
+        if comment.startswith( 'x(' ): return comment
+    return None
+
+
+def scan_header( f_name ):
+    header = PlyData.read_header( f_name )
+    counts = { elt.name: elt.count for elt in header.elements }
+
+    return {
+        'name': os.path.basename( f_name ),
+        'path': f_name,
+        'ratio': model_ratio( f_name ),
+        'axes': axis_system( header.comments ),
+        'vertices': counts.get( 'vertex', 0 ),
+        'faces': counts.get( 'face', 0 ),
+        'format': 'ascii' if header.text else 'binary',
+        'dtypes': { elt.name: elt.dtype(header.byte_order) for elt in header.elements },
+        'comments': header.comments,
+        }
+
+
+def index_dir( path, filetype='.ply' ):
+    # header-only index of the models in path, sorted by ratio
+    index = [ scan_header( f ) for f in files_in_folder( path, filetype=filetype ) ]
+    index.sort( key=lambda m: (m['ratio'] is None, m['ratio'] or 0, m['name']) )
+    return index
+
+
+def read_ply( f_name ):
+    # -> vertices, faces, comments, seconds
+    t0 = time.perf_counter()
+    vertices, faces, ply_data = PlyData.read_arrays( f_name )
+    return vertices, faces, ply_data.comments, time.perf_counter()-t0
+
+
+def to_shared( arr ):
+    # copy arr to a new shared memory block, returns what from_shared() needs
+    arr = np.ascontiguousarray( arr )
+    shm = shared_memory.SharedMemory( create=True, size=max(arr.nbytes, 1) )
+    np.ndarray( arr.shape, dtype=arr.dtype, buffer=shm.buf )[...] = arr
+    shm.close()
+    return shm.name, arr.shape, arr.dtype.str
+
+
+def from_shared( spec ):
+    # copies the block out and frees it
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory( name=name )
+    try:
+        arr = np.ndarray( shape, dtype=dtype, buffer=shm.buf ).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    return arr
+
+
+def free_shared( specs ):
+    # unlinks the blocks of to_shared() specs, skipping those already freed
+    for name, _, _ in specs:
+        try:
+            shm = shared_memory.SharedMemory( name=name )
+        except FileNotFoundError:
+            continue
+        shm.close()
+        shm.unlink()
+
+
+def shared_specs( res ):
+    # the to_shared() specs in a read_ply_shared() result
+    vertices, faces = res[:2]
+    if faces is None: return [ vertices ]
+    if isinstance( faces[0], tuple ): return [ vertices ] + list( faces )
+    return [ vertices, faces ]
+
+
+def read_ply_shared( f_name ):
+    # read_ply() for process pools, faces may be None, an array or a CSR tuple
+    vertices, faces, comments, t = read_ply( f_name )
+    arrays = [ vertices ] + ( [] if faces is None else list(faces) if isinstance( faces, tuple ) else [ faces ] )
+    specs = []
+    try:
+        for a in arrays: specs.append( to_shared( a ) )
+    except BaseException:
+        free_shared( specs )
+        raise
+    if faces is None: return specs[0], None, comments, t
+    return specs[0], tuple( specs[1:] ) if isinstance( faces, tuple ) else specs[1], comments, t
+
+
+def unshare( res ):
+    vertices, faces, comments, t = res
+    if isinstance( faces, tuple ) and isinstance( faces[0], tuple ): faces = tuple( from_shared(a) for a in faces )
+    elif faces is not None: faces = from_shared( faces )
+    return from_shared( vertices ), faces, comments, t
+
+
+def load_plys( paths, pool='thread', workers=None, report=False ):
+    # reads paths in a 'thread'/'process' pool (or 'serial'), results in the order of paths:
+    # [ (vertices, faces, comments), ... ], [ (path, seconds), ... ], wall seconds
+    t0 = time.perf_counter()
+    if pool == 'serial':
+        res = [ read_ply( f ) for f in paths ]
+    elif pool == 'thread':
+        with ThreadPoolExecutor( workers ) as ex:
+            res = list( ex.map( read_ply, paths ) )
+    elif pool == 'process':
+        resource_tracker.ensure_running() # one tracker for all workers, else each reports its blocks as leaked
+        futures, res = [], None
+        try:
+            with ProcessPoolExecutor( workers ) as ex:
+                futures = [ ex.submit( read_ply_shared, f ) for f in paths ]
+            res = [ unshare( fut.result() ) for fut in futures ]
+        finally:
+            if res is None: # a file failed, free the blocks of the others
+                for fut in futures:
+                    if fut.done() and not fut.cancelled() and fut.exception() is None: free_shared( shared_specs( fut.result() ) )
+    else:
+        raise ValueError( "pool must be 'serial', 'thread' or 'process'" )
+    wall = time.perf_counter()-t0
+
+    loaded = [ r[:3] for r in res ]
+    timings = [ (f, r[3]) for f, r in zip( paths, res ) ]
+
+    if report:
+        for f, t in timings: print( '{:<45} {:>10.2f} ms'.format( f, t*1e3 ) )
+        print( pool + ': ' + str(len(paths)) + ' files, ' + str(round(sum( t for _, t in timings )*1e3,1)) + ' ms parsing, ' + str(round(wall*1e3,1)) + ' ms wall' )
+    return loaded, timings, wall
+
+
+if __name__=='__main__':
+    pairs = []
+    for some_dir in asset_dirs:
+        out_dir = os.path.join( binary_dir, some_dir )
+        pairs += convert_tree( some_dir, out_dir, recursive=False )
+
+    benchmark_load( pairs )
+
+    ascii_files = [ p[0] for p in pairs ]
+    for pool in [ 'serial', 'thread', 'process' ]:
+        load_plys( ascii_files, pool=pool, report=True )
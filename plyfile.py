@@ -20,9 +20,14 @@ NumPy-based PLY format input and output for Python.
 """
 
 import io as _io
-from itertools import islice as _islice
+import os as _os
+import struct as _struct
+from importlib import import_module as _import_module
+from itertools import chain as _chain, islice as _islice
 
 import numpy as _np
+from numpy.lib.recfunctions import \
+    structured_to_unstructured as _structured_to_unstructured
 from sys import byteorder as _byteorder
 
 
@@ -135,6 +140,9 @@ class PlyData(object):
         Parameters
         ----------
         stream : str or readable open file
+            Files named "*.gz", "*.bz2", "*.xz" or "*.zst" are
+            decompressed as they are read.  Compressed data is never
+            memory-mapped.
         mmap : {'c', 'r', 'r+'} or bool, optional (default='c')
             Configures memory-mapping. Any falsy value disables
             memory mapping, and any non-string truthy value is
@@ -144,7 +152,10 @@ class PlyData(object):
             names to their fixed lengths.  This optional argument is
             necessary to enable memory mapping of elements that contain
             list properties. (Note that elements with variable-length
-            list properties cannot be memory-mapped.)
+            list properties cannot be memory-mapped.)  Without it,
+            list properties are still read in bulk, and their
+            contents are available as plain arrays through
+            `PlyElement.list_array`.
 
         Raises
         ------
@@ -154,6 +165,101 @@ class PlyData(object):
             If `stream` is open in text mode but the PLY header
             indicates binary encoding.
         """
+        return PlyData._read(stream, mmap, known_list_len)
+
+    @staticmethod
+    def read_arrays(stream, mmap='c', vertex_props=('x', 'y', 'z'),
+                    face_prop=None):
+        """
+        Read a PLY mesh or point cloud as plain `numpy` arrays.
+
+        No Python object is created per row.  Vertex coordinates are a
+        view of the element data whenever the requested properties
+        have a common type and are stored next to each other, which
+        for binary files means a view of the memory-mapped file.  Face
+        lists of fixed length are memory-mapped as well when possible.
+
+        Parameters
+        ----------
+        stream : str or readable open file
+        mmap : {'c', 'r', 'r+'} or bool, optional (default='c')
+            As for `PlyData.read`.
+        vertex_props : sequence of str, optional
+            Properties of the "vertex" element to return as columns.
+        face_prop : str, optional
+            List property of the "face" element holding the vertex
+            indices.  Defaults to the first list property.
+
+        Returns
+        -------
+        vertices : numpy.ndarray
+            `(N, len(vertex_props))` array.
+        faces : numpy.ndarray or tuple of numpy.ndarray or None
+            `(M, k)` array if all faces have `k` vertices, otherwise
+            a CSR-style pair `(offsets, indices)` as returned by
+            `PlyElement.list_array`.  None if there is no "face"
+            element.
+        data : PlyData
+            The full file contents, e.g. for the header comments.
+
+        Raises
+        ------
+        PlyParseError
+            If the file cannot be parsed for any reason.
+        KeyError
+            If the "vertex" element or a requested property is
+            missing.
+        """
+        data = PlyData._read(stream, mmap, {}, probe_list_len=True)
+
+        vertices = data['vertex'].columns(vertex_props)
+
+        faces = None
+        if 'face' in data:
+            face = data['face']
+            if face_prop is None:
+                face_prop = [p.name for p in face.properties
+                             if isinstance(p, PlyListProperty)][0]
+            faces = face.list_array(face_prop)
+
+        return (vertices, faces, data)
+
+    @staticmethod
+    def read_header(stream):
+        """
+        Read only the header of a PLY file.
+
+        Nothing past the end of the header is read, so this is cheap
+        regardless of file size and useful for scanning many files.
+
+        Parameters
+        ----------
+        stream : str or readable open file
+
+        Returns
+        -------
+        PlyData
+            Format, comments, and elements with their counts,
+            properties and comments.  Element data is not loaded, but
+            `PlyElement.dtype` describes the row layout.
+
+        Raises
+        ------
+        PlyHeaderParseError
+            If the header cannot be parsed.
+        """
+        (must_close, stream) = _open_stream(stream, 'read')
+        try:
+            return PlyData._parse_header(stream)
+        finally:
+            if must_close:
+                stream.close()
+
+    @staticmethod
+    def _read(stream, mmap, known_list_len, probe_list_len=False):
+        """
+        Implementation of `PlyData.read` and `PlyData.read_arrays`.
+        """
         (must_close, stream) = _open_stream(stream, 'read')
         try:
             data = PlyData._parse_header(stream)
@@ -170,7 +276,8 @@ class PlyData(object):
                     data_stream = stream
             for elt in data:
                 elt._read(data_stream, data.text, data.byte_order, mmap,
-                          known_list_len=known_list_len.get(elt.name, {}))
+                          known_list_len=known_list_len.get(elt.name, {}),
+                          probe_list_len=probe_list_len)
         finally:
             if must_close:
                 stream.close()
@@ -184,6 +291,8 @@ class PlyData(object):
         Parameters
         ----------
         stream : str or writeable open file
+            Files named "*.gz", "*.bz2", "*.xz" or "*.zst" are
+            compressed as they are written.
 
         Raises
         ------
@@ -286,6 +395,304 @@ class PlyData(object):
                  self.comments, self.obj_info))
 
 
+class PlyChunkReader(object):
+    """
+    Incremental reader for PLY files too large to be loaded at once.
+
+    The header is parsed on construction, and element data is then
+    read in chunks of at most `chunk_size` rows, so memory use is
+    bounded by the chunk size rather than the element size.
+
+    Example::
+
+        with PlyChunkReader('cloud.ply') as reader:
+            for chunk in reader.chunks('vertex'):
+                ...
+
+    Attributes
+    ----------
+    data : PlyData
+        File header.  Its elements have counts and properties, but no
+        data.
+    chunk_size : int
+    """
+
+    def __init__(self, stream, chunk_size=1 << 16):
+        """
+        Parameters
+        ----------
+        stream : str or readable open file
+        chunk_size : int, optional
+            Maximum number of rows per chunk.
+
+        Raises
+        ------
+        PlyParseError
+            If the header cannot be parsed.
+        ValueError
+            If `stream` is open in text mode but the PLY header
+            indicates binary encoding.
+        """
+        self.chunk_size = chunk_size
+        (self._must_close, self._stream) = _open_stream(stream, 'read')
+        self._wrapper = None
+        try:
+            self.data = PlyData._parse_header(self._stream)
+            if isinstance(self._stream.read(0), str):
+                if not self.data.text:
+                    raise ValueError("can't read binary-format PLY "
+                                     "from text stream")
+                self._data_stream = self._stream
+            elif self.data.text:
+                self._wrapper = _io.TextIOWrapper(self._stream, 'ascii')
+                self._data_stream = self._wrapper
+            else:
+                self._data_stream = self._stream
+        except Exception:
+            self.close()
+            raise
+
+        # index of the next element to be read
+        self._next = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close the underlying file if it was opened by this instance.
+        """
+        if self._wrapper is not None and not self._must_close:
+            self._wrapper.detach()
+            self._wrapper = None
+        if self._must_close:
+            self._stream.close()
+
+    def __iter__(self):
+        """
+        Iterate over the remaining elements in file order.
+
+        Yields
+        ------
+        element : PlyElement
+            Header-only element the chunk belongs to.
+        chunk : numpy.ndarray
+            Up to `chunk_size` rows, with the same dtype as
+            `PlyData.read` gives without memory mapping.
+        """
+        while self._next < len(self.data.elements):
+            elt = self.data.elements[self._next]
+            for chunk in self._read_chunks(elt):
+                yield (elt, chunk)
+            self._next += 1
+
+    def chunks(self, name):
+        """
+        Iterate over the chunks of one element, skipping any elements
+        before it.
+
+        Parameters
+        ----------
+        name : str
+
+        Yields
+        ------
+        numpy.ndarray
+
+        Raises
+        ------
+        KeyError
+            If the element can't be found.
+        ValueError
+            If the element has already been (partly) read.
+        """
+        index = self.data.elements.index(self.data[name])
+        if index < self._next:
+            raise ValueError("element %r has already been read" % name)
+
+        while self._next < index:
+            self._skip(self.data.elements[self._next])
+            self._next += 1
+
+        for chunk in self._read_chunks(self.data[name]):
+            yield chunk
+        self._next += 1
+
+    def _read_chunks(self, elt):
+        """
+        Generator over the chunks of element `elt`, which must be the
+        next element in the file.
+        """
+        text = self.data.text
+        byte_order = self.data.byte_order
+
+        for start in range(0, elt.count, self.chunk_size):
+            n = min(self.chunk_size, elt.count - start)
+            part = PlyElement(elt.name, elt.properties, n, elt.comments)
+            try:
+                part._read(self._data_stream, text, byte_order, False)
+            except PlyElementParseError as e:
+                row = None if e.row is None else start + e.row
+                raise PlyElementParseError(e.message, elt, row, e.prop)
+            yield part.data
+
+    def _skip(self, elt):
+        """
+        Move past element `elt`, which must be the next element in the
+        file, without keeping its data.
+        """
+        if not self.data.text and not elt._have_list and \
+                _can_seek(self._stream):
+            size = elt.dtype(self.data.byte_order).itemsize * elt.count
+            self._stream.seek(size, 1)
+        elif self.data.text:
+            lines = _islice(iter(self._data_stream.readline, ''),
+                            elt.count)
+            if sum(1 for _ in lines) < elt.count:
+                raise PlyElementParseError("early end-of-file", elt)
+        else:
+            for _ in self._read_chunks(elt):
+                pass
+
+
+class PlyChunkWriter(object):
+    """
+    Incremental writer for a PLY file with a single element whose row
+    count is not known in advance.
+
+    Rows are written as they arrive.  The header is written first
+    with a zero-padded placeholder count, which is filled in when the
+    writer is closed, so the output stream must be seekable and
+    uncompressed.
+
+    Example::
+
+        with PlyChunkWriter('cloud.ply', [('x', 'f4'), ('y', 'f4'),
+                                           ('z', 'f4')]) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+
+    Attributes
+    ----------
+    data : PlyData
+        File header.
+    count : int
+        Number of rows written so far.
+    """
+
+    def __init__(self, stream, dtype, name='vertex', text=False,
+                 byte_order='=', comments=[], obj_info=[],
+                 len_types={}, val_types={}):
+        """
+        Parameters
+        ----------
+        stream : str or writeable open binary file
+        dtype : numpy.dtype description
+            Dtype of the chunks to be written.
+        name : str, optional
+            Element name.
+        text, byte_order, comments, obj_info : optional
+            As for `PlyData`.
+        len_types, val_types : dict, optional
+            As for `PlyElement.describe`.
+
+        Raises
+        ------
+        ValueError
+            If `stream` is open in text mode or can't be rewound.
+        TypeError
+            As for `PlyElement.describe`.
+        """
+        elt = PlyElement.describe(_np.empty(0, dtype=dtype), name,
+                                  len_types, val_types)
+        self.data = PlyData([elt], text, byte_order, comments, obj_info)
+        self.count = 0
+
+        (self._must_close, self._stream) = _open_stream(stream, 'write')
+        try:
+            try:
+                self._stream.write(b'')
+            except TypeError:
+                raise ValueError("can't write PLY in chunks to a text "
+                                 "stream")
+            if not _can_seek(self._stream) or \
+                    _is_compressed(self._stream):
+                raise ValueError("can't write PLY in chunks to a "
+                                 "stream that can't be rewound")
+
+            header = self.data.header.split('\n')
+            k = header.index(elt.header.split('\n')[0])
+            header[k] = 'element %s %s' % (name, '0' * _count_digits)
+
+            self._count_pos = (self._stream.tell() +
+                               len('\n'.join(header[:k + 1])) -
+                               _count_digits)
+            self._stream.write('\n'.join(header).encode('ascii'))
+            self._stream.write(b'\n')
+        except Exception:
+            if self._must_close:
+                self._stream.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, chunk):
+        """
+        Append rows to the element.
+
+        Parameters
+        ----------
+        chunk : numpy.ndarray
+            Structured array with (at least) the fields of the
+            element's properties.
+
+        Raises
+        ------
+        ValueError
+            If a property is missing from `chunk`.
+        """
+        elt = self.data.elements[0]
+        part = PlyElement(elt.name, elt.properties, len(chunk),
+                          elt.comments)
+        part.data = chunk
+        part._write(self._stream, self.data.text, self.data.byte_order)
+        self.count += len(chunk)
+
+    def close(self):
+        """
+        Fill in the row count in the header, and close the underlying
+        file if it was opened by this instance.
+
+        Raises
+        ------
+        ValueError
+            If the row count doesn't fit in the header placeholder.
+        """
+        if self._stream is None:
+            return
+
+        try:
+            count = '%0*d' % (_count_digits, self.count)
+            if len(count) > _count_digits:
+                raise ValueError("too many rows for PLY header "
+                                 "(%d)" % self.count)
+            end = self._stream.tell()
+            self._stream.seek(self._count_pos)
+            self._stream.write(count.encode('ascii'))
+            self._stream.seek(end)
+        finally:
+            if self._must_close:
+                self._stream.close()
+            self._stream = None
+
+
 class PlyElement(object):
     """
     PLY file element.
@@ -330,6 +737,7 @@ class PlyElement(object):
 
         self._have_list = any(isinstance(p, PlyListProperty)
                               for p in self.properties)
+        self._list_arrays = {}
 
     @property
     def count(self):
@@ -341,6 +749,7 @@ class PlyElement(object):
     def _set_data(self, data):
         self._data = data
         self._count = len(data)
+        self._list_arrays = {}
         self._check_sanity()
 
     data = property(_get_data, _set_data)
@@ -497,7 +906,7 @@ class PlyElement(object):
         return elt
 
     def _read(self, stream, text, byte_order, mmap,
-              known_list_len={}):
+              known_list_len={}, probe_list_len=False):
         """
         Read the actual data from a PLY file.
 
@@ -508,19 +917,43 @@ class PlyElement(object):
         byte_order : {'<', '>', '='}
         mmap : {'c', 'r', 'r+'} or bool
         known_list_len : dict
+        probe_list_len : bool
+            Whether to take the lengths of list properties missing from
+            `known_list_len` from the first row, so that the element
+            can be memory-mapped if those lengths turn out to be fixed.
         """
+        self._list_arrays = {}
         if text:
             self._read_txt(stream)
         else:
             list_prop_names = set(p.name for p in self.properties
                                   if isinstance(p, PlyListProperty))
-            can_mmap_lists = list_prop_names <= set(known_list_len)
-            if mmap and _can_mmap(stream) and can_mmap_lists:
+            can_mmap = mmap and _can_mmap(stream)
+            probed_list_len = None
+            if (can_mmap and probe_list_len and
+                    not list_prop_names <= set(known_list_len)):
+                probed_list_len = self._probe_list_len(stream, byte_order)
+            if can_mmap and probed_list_len is not None:
+                # Memory-map with the lengths of the first row, and fall
+                # back to a bulk read if they vary.
+                mmap_mode = mmap if isinstance(mmap, str) else 'c'
+                start = stream.tell()
+                try:
+                    self._read_mmap(stream, byte_order, mmap_mode,
+                                    dict(probed_list_len, **known_list_len))
+                except PlyElementParseError:
+                    stream.seek(start)
+                    self._read_bin_bulk(stream, byte_order)
+            elif can_mmap and list_prop_names <= set(known_list_len):
                 # Loading the data is straightforward.  We will memory
                 # map the file in copy-on-write mode.
                 mmap_mode = mmap if isinstance(mmap, str) else 'c'
                 self._read_mmap(stream, byte_order, mmap_mode,
                                 known_list_len)
+            elif _can_seek(stream):
+                # The rows can be read in bulk, as long as we are able
+                # to rewind when the list lengths turn out to vary.
+                self._read_bin_bulk(stream, byte_order)
             else:
                 # A simple load is impossible.
                 self._read_bin(stream, byte_order)
@@ -561,21 +994,10 @@ class PlyElement(object):
         mmap_mode: str
         known_list_len : dict
         """
-        list_len_props = {}
-        # update the dtype to include the list length and list dtype
-        new_dtype = []
-        for p in self.properties:
-            if isinstance(p, PlyListProperty):
-                len_dtype, val_dtype = p.list_dtype(byte_order)
-                # create new dtype for the list length
-                new_dtype.append((p.name + "\nlen", len_dtype))
-                # a new dtype with size for the list values themselves
-                new_dtype.append((p.name, val_dtype,
-                                  (known_list_len[p.name],)))
-                list_len_props[p.name] = p.name + "\nlen"
-            else:
-                new_dtype.append((p.name, p.dtype(byte_order)))
-        dtype = _np.dtype(new_dtype)
+        dtype = self._fixed_list_dtype(byte_order, known_list_len)
+        list_len_props = dict((p.name, p.name + "\nlen")
+                              for p in self.properties
+                              if isinstance(p, PlyListProperty))
         num_bytes = self.count * dtype.itemsize
         offset = stream.tell()
         stream.seek(0, 2)
@@ -598,6 +1020,131 @@ class PlyElement(object):
         props = [p.name for p in self.properties]
         self._data = self._data[props]
 
+    def _fixed_list_dtype(self, byte_order, list_len):
+        """
+        Return the on-disk `numpy.dtype` of a binary row, given the
+        (fixed) lengths of all list properties.  Each list property
+        `name` is represented by a length field `name + "\\nlen"`
+        followed by a subarray field `name`.
+
+        Parameters
+        ----------
+        byte_order : {'<', '>', '='}
+        list_len : dict
+            Mapping from list property names to their fixed lengths.
+
+        Returns
+        -------
+        numpy.dtype
+        """
+        new_dtype = []
+        for p in self.properties:
+            if isinstance(p, PlyListProperty):
+                len_dtype, val_dtype = p.list_dtype(byte_order)
+                # create new dtype for the list length
+                new_dtype.append((p.name + "\nlen", len_dtype))
+                # a new dtype with size for the list values themselves
+                new_dtype.append((p.name, val_dtype, (list_len[p.name],)))
+            else:
+                new_dtype.append((p.name, p.dtype(byte_order)))
+        return _np.dtype(new_dtype)
+
+    def _set_list_columns(self, columns, byte_order='='):
+        """
+        Assemble `self.data` from whole-element columns.
+
+        List properties are given as either an `(count, k)` array or
+        a CSR-style pair `(offsets, values)`.  These are kept for
+        `list_array`, and the per-row object field of `self.data` is
+        filled with views into them.
+
+        Parameters
+        ----------
+        columns : dict
+            Mapping from property names to column data.
+        byte_order : {'<', '>', '='}
+        """
+        self._data = _np.empty(self.count, dtype=self.dtype(byte_order))
+        self._list_arrays = {}
+        for prop in self.properties:
+            column = columns[prop.name]
+            if isinstance(prop, PlyListProperty):
+                self._list_arrays[prop.name] = column
+                self._data[prop.name] = _list_rows(column, self.count)
+            else:
+                self._data[prop.name] = column
+
+    def columns(self, names):
+        """
+        Return scalar properties as the columns of a plain 2-D array.
+
+        The result is a view of `self.data` (and so of the file, if
+        the element is memory-mapped) when the properties have the
+        same type and are evenly spaced, and a copy otherwise.
+
+        Parameters
+        ----------
+        names : sequence of str
+
+        Returns
+        -------
+        numpy.ndarray
+            `(count, len(names))` array.
+
+        Raises
+        ------
+        KeyError
+            If a property can't be found.
+        """
+        return _structured_to_unstructured(self.data[list(names)],
+                                           copy=False)
+
+    def list_array(self, name):
+        """
+        Return the contents of a list property as plain arrays,
+        without a Python object per row.
+
+        Elements read by `PlyData.read` keep the arrays that were
+        parsed in bulk, so this is free for them.  Otherwise the
+        arrays are built from `self.data` on first use.
+
+        Parameters
+        ----------
+        name : str
+
+        Returns
+        -------
+        numpy.ndarray or tuple of numpy.ndarray
+            If every row of the list has the same length `k`, an
+            `(count, k)` array.  Otherwise, a CSR-style pair
+            `(offsets, values)`, where row `i` of the list is
+            `values[offsets[i]:offsets[i+1]]`.
+
+        Raises
+        ------
+        KeyError
+            If the property can't be found.
+        ValueError
+            If the property is not a list property.
+        """
+        prop = self.ply_property(name)
+        if not isinstance(prop, PlyListProperty):
+            raise ValueError("%r is not a list property" % name)
+
+        try:
+            return self._list_arrays[name]
+        except KeyError:
+            pass
+
+        column = self.data[name]
+        if column.dtype.hasobject:
+            arrays = _pack_list_rows(column, prop.list_dtype()[1])
+        else:
+            # memory-mapped list of known length
+            arrays = column
+        self._list_arrays[name] = arrays
+        return arrays
+
     def _read_txt(self, stream):
         """
         Load a PLY element from an ASCII-format PLY file.  The element
@@ -607,10 +1154,135 @@ class PlyElement(object):
         ----------
         stream : readable open file
         """
+        if self._have_list:
+            self._read_txt_lists(stream)
+        else:
+            self._read_txt_block(stream)
+
+    def _read_txt_block(self, stream):
+        """
+        Load a PLY element without list properties from an
+        ASCII-format PLY file, parsing all rows in one `numpy` call.
+
+        If the block can't be parsed in bulk, it is handed to
+        `_read_txt_rows`, which raises the appropriate
+        `PlyElementParseError`.
+
+        Parameters
+        ----------
+        stream : readable open file
+        """
+        lines = list(_islice(iter(stream.readline, ''), self.count))
+
+        if not lines and not self.count:
+            self._data = _np.empty(0, dtype=self.dtype())
+            return
+
+        if len(lines) == self.count:
+            try:
+                data = _np.loadtxt(lines, dtype=self.dtype(),
+                                   comments=None, ndmin=1)
+            except Exception:
+                pass
+            else:
+                if len(data) == self.count:
+                    self._data = data
+                    return
+
+        # Something is wrong with the input, so parse it again row by
+        # row to pinpoint the error.
+        self._read_txt_rows(iter(lines))
+
+    def _read_txt_lists(self, stream):
+        """
+        Load a PLY element with list properties from an ASCII-format
+        PLY file.  All rows are tokenized up front and every property
+        is converted as a whole column.
+
+        If the block can't be parsed in bulk, it is handed to
+        `_read_txt_rows`, which raises the appropriate
+        `PlyElementParseError`.
+
+        Parameters
+        ----------
+        stream : readable open file
+        """
+        lines = list(_islice(iter(stream.readline, ''), self.count))
+
+        if len(lines) == self.count:
+            try:
+                columns = self._parse_txt_columns(lines)
+            except Exception:
+                pass
+            else:
+                self._set_list_columns(columns)
+                return
+
+        # Something is wrong with the input, so parse it again row by
+        # row to pinpoint the error.
+        self._read_txt_rows(iter(lines))
+
+    def _parse_txt_columns(self, lines):
+        """
+        Convert the rows of an ASCII-format element to whole-element
+        columns.
+
+        Parameters
+        ----------
+        lines : list of str
+
+        Returns
+        -------
+        dict
+            Column data, as expected by `_set_list_columns`.
+
+        Raises
+        ------
+        ValueError, IndexError, OverflowError
+            If the rows don't match the element description.
+        """
+        rows = [line.split() for line in lines]
+        row_len = _np.fromiter(map(len, rows), _np.intp, len(rows))
+        tokens = _np.array(list(_chain.from_iterable(rows)), dtype=str)
+
+        # token index of the next property, per row
+        pos = _np.cumsum(row_len) - row_len
+        row_end = pos + row_len
+
+        columns = {}
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                (len_t, val_t) = prop.list_dtype()
+                n = tokens[pos].astype(len_t).astype(_np.intp)
+                offsets = _np.zeros(len(n) + 1, dtype=_np.intp)
+                _np.cumsum(n, out=offsets[1:])
+                first = _np.repeat(pos + 1 - offsets[:-1], n)
+                values = tokens[first + _np.arange(offsets[-1])]
+                columns[prop.name] = _list_column(values.astype(val_t),
+                                                  offsets)
+                pos = pos + 1 + n
+            else:
+                columns[prop.name] = tokens[pos].astype(prop.dtype())
+                pos = pos + 1
+
+        if (pos != row_end).any():
+            raise ValueError("row lengths don't match the element")
+
+        return columns
+
+    def _read_txt_rows(self, lines):
+        """
+        Load a PLY element from an ASCII-format PLY file, one row at a
+        time.  The element may contain list properties.
+
+        Parameters
+        ----------
+        lines : iterator of str
+        """
         self._data = _np.empty(self.count, dtype=self.dtype())
 
         k = 0
-        for line in _islice(iter(stream.readline, ''), self.count):
+        for line in _islice(lines, self.count):
             fields = iter(line.strip().split())
             for prop in self.properties:
                 try:
@@ -643,12 +1315,71 @@ class PlyElement(object):
         ----------
         stream : writeable open file
         """
-        for rec in self.data:
-            fields = []
-            for prop in self.properties:
-                fields.extend(prop._to_fields(rec[prop.name]))
+        try:
+            stream.write(b'')
+            binary_stream = True
+        except TypeError:
+            binary_stream = False
+
+        formats = {}
+        for start in range(0, self.count, _write_chunk_rows):
+            (row_len, values) = self._txt_fields(
+                self.data[start:start + _write_chunk_rows])
+
+            # One format string for the whole chunk, matching what
+            # `numpy.savetxt` produces for each row.
+            lengths = _np.unique(row_len)
+            for n in lengths.tolist():
+                if n not in formats:
+                    formats[n] = ' '.join(['%.18g'] * n) + '\n'
+            if len(lengths) == 1:
+                fmt = formats[lengths[0]] * len(row_len)
+            else:
+                fmt = ''.join([formats[n] for n in row_len.tolist()])
 
-            _np.savetxt(stream, [fields], '%.18g', newline='\n')
+            text = fmt % tuple(values.tolist())
+            stream.write(text.encode('ascii') if binary_stream else text)
+
+    def _txt_fields(self, data):
+        """
+        Flatten rows of element data into the fields of their
+        ASCII-format representation.
+
+        Parameters
+        ----------
+        data : numpy.ndarray
+            Slice of `self.data`.
+
+        Returns
+        -------
+        row_len : numpy.ndarray
+            Number of fields in each row.
+        values : numpy.ndarray
+            All fields, row by row, as `float64` (which represents all
+            PLY types exactly).
+        """
+        pieces = []
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                (len_t, val_t) = prop.list_dtype()
+                (offsets, values) = _list_csr(
+                    _pack_list_data(data[prop.name], val_t))
+                lengths = _np.diff(offsets)
+                pieces.append((_np.ones_like(lengths),
+                               lengths.astype(len_t)))
+                pieces.append((lengths, values))
+            else:
+                pieces.append((_np.ones(len(data), dtype=_np.intp),
+                               data[prop.name].astype(prop.dtype())))
+
+        row_len = sum(counts for (counts, _) in pieces)
+        fields = _np.empty(row_len.sum(), dtype=_np.float64)
+        cursor = _np.cumsum(row_len) - row_len
+        for (counts, values) in pieces:
+            fields[_spread(cursor, counts)] = values
+            cursor += counts
+
+        return (row_len, fields)
 
     def _read_bin(self, stream, byte_order):
         """
@@ -671,6 +1402,167 @@ class PlyElement(object):
                     raise PlyElementParseError("early end-of-file",
                                                self, k, prop)
 
+    def _read_bin_bulk(self, stream, byte_order):
+        """
+        Load a PLY element from a seekable binary PLY file, reading
+        all rows in bulk.
+
+        The lengths of the list properties in the first row are
+        assumed for every row, so that the whole element can be read
+        as one fixed-size record array.  If the lengths turn out to
+        vary, the stream is rewound and `_read_bin_csr` is used.
+
+        Parameters
+        ----------
+        stream : readable open binary file
+        byte_order : {'<', '>', '='}
+        """
+        start = stream.tell()
+        list_len = self._probe_list_len(stream, byte_order)
+
+        if list_len is not None:
+            dtype = self._fixed_list_dtype(byte_order, list_len)
+            try:
+                table = _read_array(stream, dtype, self.count)
+            except StopIteration:
+                table = ()
+            if len(table) == self.count:
+                if not self._have_list:
+                    self._data = table.copy()
+                    return
+
+                columns = {}
+                for prop in self.properties:
+                    columns[prop.name] = _np.ascontiguousarray(
+                        table[prop.name])
+                    if (isinstance(prop, PlyListProperty) and
+                            (table[prop.name + "\nlen"] !=
+                             list_len[prop.name]).any()):
+                        break
+                else:
+                    self._set_list_columns(columns, byte_order)
+                    return
+
+            stream.seek(start)
+
+        self._read_bin_csr(stream, byte_order)
+
+    def _probe_list_len(self, stream, byte_order):
+        """
+        Read the lengths of the list properties in the first row, and
+        rewind the stream.
+
+        Parameters
+        ----------
+        stream : readable open binary file
+        byte_order : {'<', '>', '='}
+
+        Returns
+        -------
+        dict or None
+            Mapping from list property names to their lengths, or
+            None if the first row couldn't be read.
+        """
+        if not self._have_list or not self.count:
+            return dict((p.name, 0) for p in self.properties
+                        if isinstance(p, PlyListProperty))
+
+        start = stream.tell()
+        list_len = {}
+        try:
+            for prop in self.properties:
+                data = prop._read_bin(stream, byte_order)
+                if isinstance(prop, PlyListProperty):
+                    list_len[prop.name] = len(data)
+        except StopIteration:
+            list_len = None
+        stream.seek(start)
+
+        return list_len
+
+    def _read_bin_csr(self, stream, byte_order):
+        """
+        Load a PLY element with variable-length list properties from a
+        seekable binary PLY file.
+
+        Only the list lengths are visited row by row; the values
+        themselves are gathered column-wise into CSR-style
+        `(offsets, values)` pairs.
+
+        Parameters
+        ----------
+        stream : readable open binary file
+        byte_order : {'<', '>', '='}
+        """
+        start = stream.tell()
+        buf = bytearray()
+
+        def fill(size):
+            # Extend `buf` to at least `size` bytes, reading ahead in
+            # large blocks.  Returns False at end-of-file.
+            while len(buf) < size:
+                block = stream.read(max(size - len(buf), 1 << 16))
+                if not block:
+                    return False
+                buf.extend(block)
+            return True
+
+        # (is_list, struct format or item size, value item size)
+        layout = []
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                (len_t, val_t) = prop.list_dtype(byte_order)
+                len_fmt = _struct_format(len_t)
+                layout.append((True, _struct.Struct(len_fmt),
+                               _np.dtype(val_t).itemsize))
+            else:
+                layout.append((False, _np.dtype(prop.dtype()).itemsize,
+                               None))
+
+        # byte offset of every property's data (after the list length
+        # field for list properties), and the list lengths
+        offsets = _np.empty((len(layout), self.count), dtype=_np.intp)
+        lengths = _np.zeros((len(layout), self.count), dtype=_np.intp)
+        off = 0
+        for k in range(self.count):
+            for (j, (is_list, fmt, val_size)) in enumerate(layout):
+                if is_list:
+                    if not fill(off + fmt.size):
+                        raise PlyElementParseError(
+                            "early end-of-file", self, k,
+                            self.properties[j])
+                    n = int(fmt.unpack_from(buf, off)[0])
+                    off += fmt.size
+                    offsets[j, k] = off
+                    lengths[j, k] = n
+                    off += n * val_size
+                else:
+                    offsets[j, k] = off
+                    off += fmt
+                if not fill(off):
+                    raise PlyElementParseError("early end-of-file",
+                                               self, k,
+                                               self.properties[j])
+
+        stream.seek(start + off)
+
+        raw = _np.frombuffer(buf, _np.uint8)
+        columns = {}
+        for (j, prop) in enumerate(self.properties):
+            if isinstance(prop, PlyListProperty):
+                val_t = prop.list_dtype(byte_order)[1]
+                list_offsets = _np.zeros(self.count + 1, dtype=_np.intp)
+                _np.cumsum(lengths[j], out=list_offsets[1:])
+                where = _spread(offsets[j], lengths[j],
+                                _np.dtype(val_t).itemsize)
+                values = _gather(raw, where, val_t)
+                columns[prop.name] = _list_column(values, list_offsets)
+            else:
+                columns[prop.name] = _gather(raw, offsets[j],
+                                             prop.dtype(byte_order))
+
+        self._set_list_columns(columns, byte_order)
+
     def _write_bin(self, stream, byte_order):
         """
         Save a PLY element to a binary PLY file.  The element may
@@ -681,9 +1573,60 @@ class PlyElement(object):
         stream : writeable open file
         byte_order : {'<', '>', '='}
         """
-        for rec in self.data:
+        columns = {}
+        list_len = {}
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                val_t = prop.list_dtype(byte_order)[1]
+                column = _pack_list_data(self.data[prop.name], val_t)
+                if not isinstance(column, tuple):
+                    list_len[prop.name] = column.shape[1]
+            else:
+                column = self.data[prop.name]
+            columns[prop.name] = column
+
+        n_lists = sum(isinstance(p, PlyListProperty)
+                      for p in self.properties)
+        if len(list_len) == n_lists:
+            # Fixed-length lists: the rows are plain records.
+            table = _np.empty(self.count,
+                              dtype=self._fixed_list_dtype(byte_order,
+                                                           list_len))
             for prop in self.properties:
-                prop._write_bin(rec[prop.name], stream, byte_order)
+                table[prop.name] = columns[prop.name]
+                if isinstance(prop, PlyListProperty):
+                    table[prop.name + "\nlen"] = list_len[prop.name]
+            _write_array(stream, table)
+            return
+
+        # Variable-length lists: scatter every property into a byte
+        # buffer laid out row by row.
+        pieces = []
+        for prop in self.properties:
+            if isinstance(prop, PlyListProperty):
+                (len_t, val_t) = prop.list_dtype(byte_order)
+                (offsets, values) = _list_csr(columns[prop.name])
+                lengths = _np.diff(offsets)
+                pieces.append((_np.ones_like(lengths),
+                               lengths.astype(len_t)))
+                pieces.append((lengths, values.astype(val_t)))
+            else:
+                pieces.append((_np.ones(self.count, dtype=_np.intp),
+                               columns[prop.name].astype(
+                                   prop.dtype(byte_order))))
+
+        row_size = sum(counts * values.itemsize
+                       for (counts, values) in pieces)
+        raw = _np.zeros(row_size.sum(), dtype=_np.uint8)
+        cursor = _np.cumsum(row_size) - row_size
+        for (counts, values) in pieces:
+            item = values.itemsize
+            where = _spread(cursor, counts, item)
+            raw[where[:, None] + _np.arange(item)] = \
+                values.view(_np.uint8).reshape(-1, item)
+            cursor += counts * item
+
+        _write_array(stream, raw)
 
     @property
     def header(self):
@@ -1340,15 +2283,68 @@ def _open_stream(stream, read_or_write):
     TypeError
         If `stream` is neither a string nor has the
         `read_or_write`-indicated method.
+    ValueError
+        If `stream` is a ".zst" filename and no zstd module is
+        available.
     """
     if hasattr(stream, read_or_write):
         return (False, stream)
     try:
-        return (True, open(stream, read_or_write[0] + 'b'))
+        return (True, _open_file(stream, read_or_write[0] + 'b'))
     except TypeError:
         raise TypeError("expected open file or filename")
 
 
+def _open_file(name, mode):
+    """
+    Open a file in binary mode, compressing or decompressing on the
+    fly if the name ends in one of the `_compressed_suffixes`.
+
+    Parameters
+    ----------
+    name : str or path-like
+    mode : {'rb', 'wb'}
+
+    Returns
+    -------
+    file : open binary file-like object
+    """
+    suffix = '.' + _os.fsdecode(name).rsplit('.', 1)[-1].lower()
+    module = _compressed_suffixes.get(suffix)
+    if module is None:
+        return open(name, mode)
+    if module == 'zstd':
+        try:
+            from compression import zstd as module
+        except ImportError:
+            try:
+                import zstandard as module
+            except ImportError:
+                raise ValueError("reading or writing '.zst' files "
+                                 "requires Python 3.14 or the "
+                                 "'zstandard' package")
+    else:
+        module = _import_module(module)
+    return module.open(name, mode)
+
+
+def _is_compressed(stream):
+    """
+    Determine if an open file object compresses or decompresses its
+    data, in which case its file descriptor, if any, refers to the
+    compressed file and must not be memory-mapped.
+
+    Parameters
+    ----------
+    stream : open binary file
+
+    Returns
+    -------
+    bool
+    """
+    return type(stream).__module__.split('.')[0] in _compressed_modules
+
+
 def _check_name(name):
     """
     Check that a string can be safely be used as the name of an element
@@ -1429,6 +2425,194 @@ def _write_array(stream, array):
     stream.write(array.tobytes())
 
 
+def _can_seek(stream):
+    """
+    Determine if a readable stream can be rewound.
+
+    Parameters
+    ----------
+    stream : open binary file
+
+    Returns
+    -------
+    bool
+    """
+    try:
+        return stream.seekable()
+    except Exception:
+        return False
+
+
+def _struct_format(dtype):
+    """
+    Return the `struct` format string for a scalar `numpy` dtype.
+
+    Parameters
+    ----------
+    dtype : dtype description
+
+    Returns
+    -------
+    str
+    """
+    dtype = _np.dtype(dtype)
+    order = {'<': '<', '>': '>', '=': '=', '|': '='}[dtype.byteorder]
+    return order + _struct_codes[dtype.str[1:]]
+
+
+def _gather(raw, where, dtype):
+    """
+    Gather scalars of type `dtype` starting at the given byte offsets
+    of a byte array.
+
+    Parameters
+    ----------
+    raw : numpy.ndarray
+        One-dimensional `uint8` array.
+    where : numpy.ndarray
+        Byte offsets.
+    dtype : dtype description
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    dtype = _np.dtype(dtype)
+    idx = where[:, None] + _np.arange(dtype.itemsize)
+    return _np.ascontiguousarray(raw[idx]).view(dtype).reshape(-1)
+
+
+def _list_column(values, offsets):
+    """
+    Return list data as an `(n, k)` array if all rows have the same
+    length `k`, otherwise as the CSR-style pair `(offsets, values)`.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Concatenated list values.
+    offsets : numpy.ndarray
+        Start of each row in `values`, followed by `len(values)`.
+
+    Returns
+    -------
+    numpy.ndarray or tuple of numpy.ndarray
+    """
+    n = len(offsets) - 1
+    lengths = _np.diff(offsets)
+    if n and (lengths == lengths[0]).all():
+        return values.reshape(n, lengths[0])
+    return (offsets, values)
+
+
+def _list_rows(column, count):
+    """
+    Convert list data as returned by `_list_column` to an object
+    array of per-row views.
+
+    Parameters
+    ----------
+    column : numpy.ndarray or tuple of numpy.ndarray
+    count : int
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    if isinstance(column, tuple):
+        (offsets, values) = column
+        rows = (values[a:b] for (a, b) in zip(offsets[:-1], offsets[1:]))
+    else:
+        rows = iter(column)
+    return _np.fromiter(rows, dtype=object, count=count)
+
+
+def _pack_list_data(column, dtype):
+    """
+    Convert a list property column of element data to the format
+    returned by `_list_column`.
+
+    Parameters
+    ----------
+    column : numpy.ndarray
+        Object array of list rows, or a subarray field (as produced
+        by memory mapping).
+    dtype : dtype description
+
+    Returns
+    -------
+    numpy.ndarray or tuple of numpy.ndarray
+    """
+    if column.dtype.hasobject:
+        return _pack_list_rows(column, dtype)
+    return _np.ascontiguousarray(column, dtype=dtype).reshape(
+        len(column), -1)
+
+
+def _list_csr(column):
+    """
+    Convert list data as returned by `_list_column` to the CSR-style
+    pair `(offsets, values)`.
+
+    Parameters
+    ----------
+    column : numpy.ndarray or tuple of numpy.ndarray
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+    """
+    if isinstance(column, tuple):
+        return column
+    (n, k) = column.shape
+    return (_np.arange(n + 1, dtype=_np.intp) * k, column.reshape(-1))
+
+
+def _spread(start, counts, step=1):
+    """
+    Return the positions `start[i] + j * step` for every row `i` and
+    `0 <= j < counts[i]`, row by row.
+
+    Parameters
+    ----------
+    start : numpy.ndarray
+    counts : numpy.ndarray
+    step : int, optional
+
+    Returns
+    -------
+    numpy.ndarray
+    """
+    offsets = _np.cumsum(counts) - counts
+    first = _np.repeat(start - offsets * step, counts)
+    return first + _np.arange(counts.sum(), dtype=_np.intp) * step
+
+
+def _pack_list_rows(rows, dtype):
+    """
+    Convert an object array of list rows to the format returned by
+    `_list_column`.
+
+    Parameters
+    ----------
+    rows : numpy.ndarray
+    dtype : dtype description
+
+    Returns
+    -------
+    numpy.ndarray or tuple of numpy.ndarray
+    """
+    lengths = _np.fromiter(map(len, rows), _np.intp, len(rows))
+    offsets = _np.zeros(len(rows) + 1, dtype=_np.intp)
+    _np.cumsum(lengths, out=offsets[1:])
+    if len(rows):
+        values = _np.concatenate([_np.asarray(r, dtype=dtype).ravel()
+                                  for r in rows])
+    else:
+        values = _np.empty(0, dtype=dtype)
+    return _list_column(values, offsets)
+
+
 def _can_mmap(stream):
     """
     Determine if a readable stream can be memory-mapped, using some good
@@ -1442,6 +2626,8 @@ def _can_mmap(stream):
     -------
     bool
     """
+    if _is_compressed(stream):
+        return False
     try:
         pos = stream.tell()
         try:
@@ -1501,6 +2687,38 @@ for (_a, _b) in _data_type_relation:
         _types_set.add(_b)
 
 
+# Number of rows formatted at a time by the ASCII writer.
+_write_chunk_rows = 1 << 16
+
+# Width of the zero-padded element count written by `PlyChunkWriter`.
+_count_digits = 12
+
+# File name suffixes read and written through a compressed stream,
+# and the modules providing it.  ".zst" uses `compression.zstd`
+# (Python 3.14) or the optional `zstandard` package.
+_compressed_suffixes = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'lzma',
+    '.lzma': 'lzma',
+    '.zst': 'zstd'
+}
+
+_compressed_modules = ('gzip', 'bz2', 'lzma', 'compression', 'zstandard')
+
+_struct_codes = {
+    'i1': 'b',
+    'u1': 'B',
+    'b1': '?',
+    'i2': 'h',
+    'u2': 'H',
+    'i4': 'i',
+    'u4': 'I',
+    'f4': 'f',
+    'f8': 'd'
+}
+
+
 _byte_order_map = {
     'ascii': '=',
     'binary_little_endian': '<',
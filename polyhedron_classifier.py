@@ -0,0 +1,87 @@
+import numpy as np
+
+from ply_tools import index_dir
+from mesh_geometry import apply_logs
+from mesh_bvh import get_bvh, points_in_bvh, nearest_surface
+from valsson_2025_model_restore_coords import out_dir
+
+'''
+    Classifies CPTu readings (Bq, Fr, Qt) against the 2025 sensitivity model
+
+    The 11 polyhedra in out_dir (000p_a.ply ... 100p_a.ply) are loaded once, with log10 applied
+    to the Fr & Qt axes as in prep_mesh().  Each point gets the highest percentage whose
+    polyhedron contains it, or -1 if none does.  Points are tested against the models from the
+    highest percentage down, and each model only sees the points not yet assigned.
+    Containment and surface distances are answered by a BVH per model (mesh_bvh), cached in
+    saves/ after the first run.
+
+    usage:
+        classifier = polyhedron_classifier()
+        percentages = classifier.classify( bq, fr, qt )
+'''
+
+
+class polyhedron_classifier():
+    def __init__( self, model_dir=out_dir, logs=[False, True, True], models=None, bvhs=None ):
+        # models (index_dir entries) & bvhs may be given, e.g. attached from shared memory
+        self.model_dir = model_dir
+        self.logs = logs
+        if models is None:
+            self.load()
+        else:
+            self.set_models( models, bvhs )
+
+
+    def load( self ):
+        models = [ m for m in index_dir( self.model_dir ) if m['ratio'] is not None ] # sorted by ratio
+        self.set_models( models, [ get_bvh( m['path'], self.logs ) for m in models ] )
+
+
+    def set_models( self, models, bvhs ):
+        self.models, self.bvhs = list( models ), list( bvhs )
+        self.percentages = [ int(round( m['ratio']*100 )) for m in self.models ]
+        self.var_names = [ m['axes'] for m in self.models ]
+
+
+    def transform( self, points ):
+        # raw (Bq, Fr, Qt) -> model coordinates, non-positive values end up outside all models
+        return apply_logs( points, self.logs )
+
+
+    def classify_points( self, points ):
+        # points: (n,3) array of raw (Bq, Fr, Qt), returns int array of percentages (-1: none)
+        points_ = self.transform( points )
+        res = np.full( len(points_), -1, dtype=np.int64 )
+        todo = np.flatnonzero( np.all(np.isfinite(points_), axis=1) )
+
+        for percentage, bvh in sorted( zip(self.percentages, self.bvhs), key=lambda m: -m[0] ):
+            if len( todo ) == 0: break
+            inside = points_in_bvh( bvh, points_[todo] )
+            res[ todo[inside] ] = percentage
+            todo = todo[ ~inside ]
+
+        return res
+
+
+    def surface_distance( self, points, percentage ):
+        # distance from raw (Bq, Fr, Qt) points to the surface of one model, in model coordinates
+        bvh = self.bvhs[ self.percentages.index( percentage ) ]
+        return nearest_surface( bvh, self.transform(points) )[0]
+
+
+    def classify( self, bq, fr, qt ):
+        return self.classify_points( np.column_stack( (np.ravel(bq), np.ravel(fr), np.ravel(qt)) ) ).reshape( np.shape(bq) )
+
+
+if __name__=='__main__':
+    import time
+    classifier = polyhedron_classifier()
+
+    rng = np.random.default_rng( 0 )
+    n = 100000
+    bq, fr, qt = rng.uniform( -0.2, 1.7, n ), 10**rng.uniform( -1.4, 0.8, n ), 10**rng.uniform( 0.2, 1.8, n )
+
+    t0 = time.perf_counter()
+    res = classifier.classify( bq, fr, qt )
+    print( str(n) + ' points in ' + str(round(time.perf_counter()-t0, 2)) + ' s' )
+    print( dict(zip( *np.unique(res, return_counts=True) )) )
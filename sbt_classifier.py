@@ -0,0 +1,185 @@
+import numpy as np
+
+from cptu_classification_models_2d import model_defs
+
+'''
+    Region lookup for the 2D SBT charts in model_defs
+
+    Each chart's region polygons are stored as one array of edges in the chart's native space
+    (log10 of 'log' axes), so a crossing-number test runs over all polygons of a chart at once:
+    a point is inside a polygon if a ray in +x crosses an odd number of its edges.  Points
+    get the lowest region id containing them, 0 for none (also for non-positive values on
+    log axes).
+
+    Every edge is evaluated with its endpoints sorted on y, so a boundary shared by two
+    regions gives bitwise the same crossing in both, and points on it land in exactly one.
+
+    Each chart also gets a spatial index at import: a bucket_n x bucket_n grid over its extent
+    listing the regions whose bounding box overlaps each bucket.  A point is only tested against
+    the edges of the regions listed in its bucket whose box contains it (one or two for most
+    points), and plotting code can ask for the regions overlapping a view with regions_in_box().
+
+    usage:
+        ids = classify_chart( 'robertson_90_fr', fr, qt )
+        ids = classify_all( {'Bq':bq, 'Fr':fr, 'Qt':qt, 'qt':qt_raw, 'Rf':rf} ) # {chart: ids}
+        for region_id in regions_in_box( 'robertson_90_fr', ((-1, 1), (0, 3)) ): ...
+'''
+
+block_size = 1 << 20 # (point, edge) pairs evaluated at a time
+bucket_n = 16 # buckets per axis of the region index
+
+
+def to_native( values, scale ):
+    values = np.asarray( values, dtype=np.float64 )
+    if scale != 'log': return values
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        return np.where( values > 0, np.log10( np.where(values > 0, values, 1) ), np.nan )
+
+
+def prep_chart( chart ):
+    # edges of all region polygons in native coordinates, grouped by region (ids ascending)
+    x_scale, y_scale = chart['desc']['x_axis'][1], chart['desc']['y_axis'][1]
+    ids, x0, y0, x1, y1, starts = [], [], [], [], [], []
+
+    for region_id in sorted( chart['regions'] ):
+        xs = to_native( chart['regions'][region_id]['xy'][0], x_scale )
+        ys = to_native( chart['regions'][region_id]['xy'][1], y_scale )
+        if xs[0] != xs[-1] or ys[0] != ys[-1]: # close ring
+            xs, ys = np.append( xs, xs[0] ), np.append( ys, ys[0] )
+
+        starts.append( sum( len(x) for x in x0 ) )
+        ids.append( region_id )
+        x0.append( xs[:-1] ), y0.append( ys[:-1] ), x1.append( xs[1:] ), y1.append( ys[1:] )
+
+    x0, y0, x1, y1 = [ np.concatenate( v ) for v in (x0, y0, x1, y1) ]
+    swap = y0 > y1 # sort endpoints on y
+    x0, x1 = np.where( swap, x1, x0 ), np.where( swap, x0, x1 )
+    y0, y1 = np.where( swap, y1, y0 ), np.where( swap, y0, y1 )
+
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        slope = (x1 - x0) / (y1 - y0) # inf/nan for horizontal edges, never crossed
+
+    prep = {
+        'name': chart['desc']['short_name'],
+        'axes': ( chart['desc']['x_axis'], chart['desc']['y_axis'] ),
+        'lims': ( (float(min(x0.min(), x1.min())), float(max(x0.max(), x1.max()))), (float(y0.min()), float(y1.max())) ), # native extent of all regions
+        'ids': np.array( ids ),
+        'starts': np.array( starts ),
+        'x0': x0, 'x1': x1, 'y0': y0, 'y1': y1, 'slope': slope,
+        }
+    prep['index'] = build_index( prep )
+    return prep
+
+
+def build_index( prep, n=bucket_n ):
+    # region bounding boxes (regions, 4) and the regions overlapping each bucket (n, n, regions)
+    x_lo = np.minimum.reduceat( np.minimum(prep['x0'], prep['x1']), prep['starts'] )
+    x_hi = np.maximum.reduceat( np.maximum(prep['x0'], prep['x1']), prep['starts'] )
+    y_lo, y_hi = np.minimum.reduceat( prep['y0'], prep['starts'] ), np.maximum.reduceat( prep['y1'], prep['starts'] )
+    boxes = np.column_stack( (x_lo, x_hi, y_lo, y_hi) )
+
+    index = { 'lims': prep['lims'], 'n': n, 'boxes': boxes }
+    b0 = bucket_index( index, boxes[:, 0], boxes[:, 2] )
+    b1 = bucket_index( index, boxes[:, 1], boxes[:, 3] )
+
+    buckets = np.zeros( (n, n, len(boxes)), dtype=bool )
+    for region, (i0, j0), (i1, j1) in zip( range(len(boxes)), b0, b1 ):
+        buckets[ i0:i1+1, j0:j1+1, region ] = True
+    index['buckets'] = buckets
+    return index
+
+
+def bucket_index( index, x, y ):
+    # (k,2) bucket of native points, clipped to the grid
+    lo, hi = np.array( index['lims'], dtype=np.float64 ).T
+    idx = np.floor( np.nan_to_num( (np.column_stack( (x, y) ) - lo) / (hi - lo) * index['n'] ) )
+    return np.clip( idx, 0, index['n']-1 ).astype( np.int64 )
+
+
+def in_boxes( boxes, x, y ):
+    with np.errstate( invalid='ignore' ):
+        return (boxes[:, 0] <= x) & (x <= boxes[:, 1]) & (boxes[:, 2] <= y) & (y <= boxes[:, 3])
+
+
+def candidates( prep, x, y ):
+    # (k, regions) mask of the regions whose box holds each native point, from its bucket
+    index = prep['index']
+    idx = bucket_index( index, x, y )
+    return index['buckets'][ idx[:, 0], idx[:, 1] ] & in_boxes( index['boxes'], x[:, None], y[:, None] )
+
+
+charts = { name: prep_chart( chart ) for name, chart in model_defs.items() }
+
+
+def crossings( prep, region, x, y ):
+    # crossing counts of +x rays from native points x, y with the edges of one region (index into ids)
+    edges = slice( prep['starts'][region], prep['starts'][region+1] if region+1 < len(prep['starts']) else len(prep['x0']) )
+    x0, y0, y1, slope = [ prep[key][edges] for key in ('x0', 'y0', 'y1', 'slope') ]
+
+    counts = np.zeros( len(x), dtype=np.int64 )
+    step = max( 1, block_size//len(x0) )
+    for start in range( 0, len(x), step ):
+        xb, yb = x[ start:start+step, None ], y[ start:start+step, None ]
+        with np.errstate( invalid='ignore' ):
+            spans = (y0 <= yb) & (yb < y1) # half-open, so vertices count once
+            hits = spans & (xb < x0 + (yb - y0) * slope)
+        counts[ start:start+step ] = np.count_nonzero( hits, axis=1 )
+    return counts
+
+
+def classify_native( prep, x, y ):
+    # lowest region id containing each native point, testing only its candidate regions
+    x, y = np.asarray( x, dtype=np.float64 ), np.asarray( y, dtype=np.float64 )
+    cands = candidates( prep, x, y )
+    res = np.zeros( len(x), dtype=np.int64 )
+
+    for region, region_id in enumerate( prep['ids'] ): # ascending ids
+        test = np.flatnonzero( cands[:, region] & (res == 0) )
+        inside = crossings( prep, region, x[test], y[test] ) % 2 == 1
+        res[ test[inside] ] = region_id
+    return res
+
+
+def regions_in_box( name, lims ):
+    # ids of the regions of chart name whose bounding box overlaps lims ((x_lo, x_hi), (y_lo, y_hi)), native units
+    boxes = charts[ name ]['index']['boxes']
+    (x_lo, x_hi), (y_lo, y_hi) = lims
+    overlap = (boxes[:, 0] <= x_hi) & (x_lo <= boxes[:, 1]) & (boxes[:, 2] <= y_hi) & (y_lo <= boxes[:, 3])
+    return charts[ name ]['ids'][ overlap ].tolist()
+
+
+def classify_chart( name, x, y ):
+    # region id per point for chart name, x & y in chart units (not logged)
+    prep = charts[ name ]
+    x_, y_ = to_native( np.ravel(x), prep['axes'][0][1] ), to_native( np.ravel(y), prep['axes'][1][1] )
+    return classify_native( prep, x_, y_ ).reshape( np.shape(x) )
+
+
+def classify_all( values, names=None ):
+    # values: axis name -> array (e.g. 'Bq', 'Qt', 'Fr'), returns {chart: ids} for charts with both axes given
+    res = {}
+    for name in ( charts if names is None else names ):
+        x_name, y_name = charts[name]['axes'][0][0], charts[name]['axes'][1][0]
+        if x_name in values and y_name in values:
+            res[ name ] = classify_chart( name, values[x_name], values[y_name] )
+    return res
+
+
+if __name__=='__main__':
+    import time
+    from studies import STUDY4
+
+    for soil_type in STUDY4:
+        values = { 'Bq': soil_type['BQ'], 'Qt': soil_type['QQT'], 'Fr': soil_type['FR'], 'qt': soil_type['QT'], 'Rf': soil_type['RF'],
+                   'fs': soil_type['FS'], 'qe': soil_type['QE'], 'du_n': soil_type['DUN'] }
+        ids = classify_all( values )
+        for name in ids:
+            values_, counts = np.unique( ids[name], return_counts=True )
+            print( soil_type['name'] + ' ' + charts[name]['name'] + ': ' + str( dict(zip( values_.tolist(), counts.tolist() )) ) )
+
+    rng = np.random.default_rng( 0 )
+    n = 1000000
+    values = { 'Bq': rng.uniform(-0.6, 1.4, n), 'Qt': 10**rng.uniform(0, 3, n), 'Fr': 10**rng.uniform(-1, 1, n) }
+    t0 = time.perf_counter()
+    ids = classify_all( values )
+    print( str(n) + ' points, ' + str(len(ids)) + ' charts: ' + str(round(time.perf_counter()-t0, 2)) + ' s' )
@@ -0,0 +1,163 @@
+import os
+import json
+import hashlib
+import numpy as np
+from scipy import ndimage
+
+from sbt_classifier import charts, to_native, classify_native
+
+'''
+    Raster lookup tables for the 2D SBT charts in model_defs
+
+    Each chart is rasterized to n x n cells spanning the native (lin/log) extent of its regions,
+    each cell holding the region id containing it (0 for none), or boundary_label if an edge of
+    any region may pass through it.  Edges are sampled at less than one cell spacing and every
+    sample marks its cell and the 8 around it, so all other cells lie entirely within one region.
+    As in voxel_grid, the exact test is only run once per connected region of such cells.
+
+    At runtime raster_classifier does one index per point and refines boundary cells with the
+    exact polygon test (sbt_classifier).  Points outside the raster are outside all regions.
+
+    get_raster() saves each chart as saves/sbt_<chart>_n<n>_<key>.npy (uint8) with a .json of its
+    limits, loaded with mmap_mode='r'.  The key is a hash of the chart edges and n.
+
+    usage:
+        classifier = raster_classifier()
+        ids = classifier.classify_chart( 'robertson_90_fr', fr, qt )
+        ids = classifier.classify_all( {'Bq':bq, 'Fr':fr, 'Qt':qt} ) # {chart: ids}
+'''
+
+boundary_label = 255
+saves_folder = 'saves'
+
+
+def raster_lims( prep, n ):
+    # extent of the regions, grown by one cell
+    return [ ( lo - (hi-lo)/(n-2), hi + (hi-lo)/(n-2) ) for lo, hi in prep['lims'] ]
+
+
+def cell_index( x_, y_, lims, n ):
+    # (k,2) cell index of native points, and a mask of the points inside the raster
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    with np.errstate( invalid='ignore' ):
+        idx = np.floor( (np.column_stack( (x_, y_) ) - lo) / (hi - lo) * n )
+        inside = np.all( (idx >= 0) & (idx < n), axis=1 )
+    return np.where( inside[:, None], idx, 0 ).astype( np.int64 ), inside
+
+
+def mark_edges( raster, prep, lims ):
+    # marks the cells around samples taken along every edge
+    n = raster.shape[0]
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    c0 = (np.column_stack( (prep['x0'], prep['y0']) ) - lo) / (hi - lo) * n # edge ends in cell units
+    c1 = (np.column_stack( (prep['x1'], prep['y1']) ) - lo) / (hi - lo) * n
+
+    steps = np.ceil( np.abs(c1 - c0).max(axis=1) * 2 ).astype( np.int64 ) + 1 # half cell spacing
+    edge = np.repeat( np.arange(len(steps)), steps )
+    t = ( np.arange( steps.sum() ) - np.repeat( np.cumsum(steps)-steps, steps ) ) / np.maximum( steps[edge]-1, 1 )
+    samples = np.floor( c0[edge] + (c1[edge] - c0[edge]) * t[:, None] ).astype( np.int64 )
+
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            raster[ np.clip( samples[:, 0]+dx, 0, n-1 ), np.clip( samples[:, 1]+dy, 0, n-1 ) ] = boundary_label
+
+
+def build_raster( prep, lims, n=512 ):
+    raster = np.zeros( (n, n), dtype=np.uint8 )
+    mark_edges( raster, prep, lims )
+
+    # one exact test per connected region of non-boundary cells
+    regions, n_regions = ndimage.label( raster != boundary_label )
+    first = np.unique( regions.ravel(), return_index=True )[1][1:] # skip region 0 (boundary)
+    centers = np.column_stack( np.unravel_index( first, raster.shape ) ) + 0.5
+
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    centers_ = lo + centers / n * (hi - lo)
+    labels = np.append( boundary_label, classify_native( prep, centers_[:, 0], centers_[:, 1] ) ).astype( np.uint8 )
+    return labels[ regions ]
+
+
+def raster_key( prep, n ):
+    h = hashlib.sha1( str( (prep['lims'], n, boundary_label) ).encode() )
+    for key in ( 'ids', 'starts', 'x0', 'x1', 'y0', 'y1' ):
+        h.update( np.ascontiguousarray( prep[key] ).tobytes() )
+    return h.hexdigest()[:16]
+
+
+def save_raster( raster, lims, file_path ):
+    np.save( file_path, raster )
+    with open( os.path.splitext(file_path)[0] + '.json', 'w' ) as f:
+        json.dump( { 'lims': [ list(lim) for lim in lims ], 'n': raster.shape[0], 'boundary_label': boundary_label }, f )
+
+
+def load_raster( file_path ):
+    with open( os.path.splitext(file_path)[0] + '.json' ) as f:
+        meta = json.load( f )
+    return np.load( file_path, mmap_mode='r' ), meta['lims']
+
+
+def get_raster( name, n=512 ):
+    prep = charts[ name ]
+    save_name = 'sbt_' + name + '_n' + str(n) + '_' + raster_key( prep, n ) + '.npy'
+    file_path = os.path.join( saves_folder, save_name )
+
+    if not os.path.isfile( file_path ):
+        os.makedirs( saves_folder, exist_ok=True )
+        lims = raster_lims( prep, n )
+        save_raster( build_raster( prep, lims, n ), lims, file_path )
+    return load_raster( file_path )
+
+
+class raster_classifier():
+    def __init__( self, n=512, names=None ):
+        self.rasters = { name: get_raster( name, n ) for name in ( charts if names is None else names ) }
+
+
+    def classify_chart( self, name, x, y ):
+        # as sbt_classifier.classify_chart(), exact test only for boundary cells
+        prep, (raster, lims) = charts[ name ], self.rasters[ name ]
+        x_, y_ = to_native( np.ravel(x), prep['axes'][0][1] ), to_native( np.ravel(y), prep['axes'][1][1] )
+        idx, inside = cell_index( x_, y_, lims, raster.shape[0] )
+
+        res = np.where( inside, raster[ idx[:, 0], idx[:, 1] ], 0 ).astype( np.int64 )
+        exact = res == boundary_label
+        res[ exact ] = classify_native( prep, x_[exact], y_[exact] )
+        return res.reshape( np.shape(x) )
+
+
+    def boundary_fraction( self, name ):
+        raster = self.rasters[ name ][0]
+        return np.count_nonzero( np.asarray(raster) == boundary_label ) / raster.size
+
+
+    def classify_all( self, values, names=None ):
+        # values: axis name -> array, returns {chart: ids} for charts with both axes given
+        res = {}
+        for name in ( self.rasters if names is None else names ):
+            x_name, y_name = charts[name]['axes'][0][0], charts[name]['axes'][1][0]
+            if x_name in values and y_name in values:
+                res[ name ] = self.classify_chart( name, values[x_name], values[y_name] )
+        return res
+
+
+if __name__=='__main__':
+    import time
+    from sbt_classifier import classify_all
+
+    t0 = time.perf_counter()
+    classifier = raster_classifier()
+    print( 'rasters ready in ' + str(round(time.perf_counter()-t0, 2)) + ' s' )
+    for name in classifier.rasters:
+        print( '  ' + name + ': ' + str(round( classifier.boundary_fraction(name)*100, 1 )) + '% boundary cells' )
+
+    rng = np.random.default_rng( 0 )
+    n = 1000000
+    values = { 'Bq': rng.uniform(-0.6, 1.4, n), 'Qt': 10**rng.uniform(0, 3, n), 'Fr': 10**rng.uniform(-1, 1, n) }
+
+    t0 = time.perf_counter()
+    ids = classifier.classify_all( values )
+    print( str(n) + ' points, ' + str(len(ids)) + ' charts: ' + str(round(time.perf_counter()-t0, 2)) + ' s' )
+
+    exact = classify_all( { key: v[:100000] for key, v in values.items() } )
+    for name in exact:
+        print( '  ' + name + ' matches exact test: ' + str( np.array_equal( ids[name][:100000], exact[name] ) ) )
@@ -0,0 +1,144 @@
+import os
+import hashlib
+import numpy as np
+from scipy import ndimage
+
+from polyhedron_classifier import polyhedron_classifier
+from mesh_bvh import nearest_surface, points_in_bvh
+from voxel_grid import model_ax_lims
+
+'''
+    Signed distances to the 2025 model shells and a continuous sensitivity score
+
+    For each polyhedron the signed distance (negative inside) is sampled on an n^3 grid
+    spanning the get_ax_lims() box in model coordinates (Bq, log Fr, log Qt), grown to hold
+    all shells, using the BVH for the distances and the containment test for the sign.  Grids are cached as
+    saves/sdf_<model>_n<n>_<key>.npy, keyed on the mesh file contents, the limits and n, and
+    loaded with mmap_mode='r'.  For readings the sign is always the exact containment test, so
+    the score never contradicts classify_points(); only the distance is trilinearly interpolated
+    in the grids.  Readings within one cell diagonal of a surface, outside the box, or all
+    readings with exact=True get their distance from the BVH directly.
+
+    score(): a reading inside shell k (percentage P_k, signed distance s_k < 0) but outside
+    the next shell (P_k+1, s_k+1 > 0) scores
+        P_k + (P_k+1 - P_k) * |s_k| / (|s_k| + s_k+1)
+    i.e. 43% when it is 30% of the way from the 40% shell to the 50% shell.  Readings inside
+    the 100% shell score 100, readings outside all shells -1, which includes all readings
+    outside the grid box, so those are not looked up.
+'''
+
+saves_folder = 'saves'
+
+
+def sdf_lims( classifier, pad=0.05 ):
+    # get_ax_lims() box grown to hold all shells with some margin
+    tris = np.concatenate( [ bvh['tris'].reshape(-1, 3) for bvh in classifier.bvhs ] )
+    lo, hi = tris.min( axis=0 ), tris.max( axis=0 )
+    lo, hi = lo - pad*(hi-lo), hi + pad*(hi-lo)
+    return [ ( min(lim[0], l), max(lim[1], h) ) for lim, l, h in zip( model_ax_lims(classifier), lo.tolist(), hi.tolist() ) ]
+
+
+def grid_points( lims, n ):
+    axes = [ np.linspace( lo, hi, n ) for lo, hi in lims ]
+    return np.stack( np.meshgrid( *axes, indexing='ij' ), axis=-1 ).reshape( -1, 3 )
+
+
+def signed_distance( bvh, points_ ):
+    # exact signed distance to the mesh, negative inside
+    dist = nearest_surface( bvh, points_ )[0]
+    return np.where( points_in_bvh( bvh, points_ ), -dist, dist )
+
+
+def build_sdf( bvh, lims, n=32 ):
+    return signed_distance( bvh, grid_points( lims, n ) ).reshape( n, n, n ).astype( np.float32 )
+
+
+def get_sdf( model, bvh, lims, n=32 ):
+    # sdf grid of one model (index_dir entry), cached by mesh file hash
+    with open( model['path'], 'rb' ) as f:
+        key = hashlib.sha1( f.read() + str( (lims, n) ).encode() ).hexdigest()[:16]
+    save_name = 'sdf_' + os.path.splitext( model['name'] )[0] + '_n' + str(n) + '_' + key + '.npy'
+    file_path = os.path.join( saves_folder, save_name )
+
+    if not os.path.isfile( file_path ):
+        os.makedirs( saves_folder, exist_ok=True )
+        np.save( file_path, build_sdf( bvh, lims, n ) )
+    return np.load( file_path, mmap_mode='r' )
+
+
+def box_mask( lims, points_ ):
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    with np.errstate( invalid='ignore' ):
+        return np.all( (points_ >= lo) & (points_ <= hi), axis=1 )
+
+
+def interp_sdf( sdf, lims, points_ ):
+    # trilinear interpolation, and a mask of the points inside the grid box
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    coords = (points_ - lo) / (hi - lo) * (sdf.shape[0]-1)
+    values = ndimage.map_coordinates( np.asarray(sdf), np.nan_to_num(coords).T, order=1, mode='nearest' )
+    return values, box_mask( lims, points_ )
+
+
+class sdf_classifier():
+    def __init__( self, n=32, classifier=None ):
+        self.classifier = polyhedron_classifier() if classifier is None else classifier
+        self.lims = sdf_lims( self.classifier )
+        self.sdfs = [ get_sdf( m, bvh, self.lims, n ) for m, bvh in zip(self.classifier.models, self.classifier.bvhs) ]
+        self.cell_diagonal = float( np.linalg.norm( np.diff( self.lims, axis=1 ).ravel() / (n-1) ) ) # interpolation error bound
+
+
+    def signed_distances( self, points, exact=False ):
+        # (k, models) signed distances of raw (Bq, Fr, Qt) points, models in order of percentage
+        # sign from points_in_bvh() as in classify_points(), distance interpolated unless near the surface
+        points_ = self.classifier.transform( points )
+        finite = np.all( np.isfinite(points_), axis=1 )
+        points_ = points_[ finite ]
+        res = np.full( (len(finite), len(self.sdfs)), np.inf )
+
+        for i, (sdf, bvh) in enumerate( zip(self.sdfs, self.classifier.bvhs) ):
+            values, in_box = interp_sdf( sdf, self.lims, points_ )
+            dist = np.abs( values )
+            near = ~in_box | exact | (dist < self.cell_diagonal)
+            dist[ near ] = nearest_surface( bvh, points_[near] )[0]
+            res[ finite, i ] = np.where( points_in_bvh( bvh, points_ ), -dist, dist )
+        return res
+
+
+    def score( self, points, exact=False ):
+        # continuous percentage between the containing shell and the next one, -1 outside all;
+        # the containing shell is the one of classify_points(), the score refines it
+        points = np.array( points, dtype=np.float64, ndmin=2 )
+        in_box = box_mask( self.lims, self.classifier.transform(points) )
+        s = np.full( (len(points), len(self.sdfs)), np.inf )
+        s[ in_box ] = self.signed_distances( points[in_box], exact )
+
+        percentages = np.array( self.classifier.percentages, dtype=np.float64 )
+        rows = np.arange( len(s) )
+
+        inside = s < 0
+        k = np.where( inside.any(axis=1), len(percentages)-1 - np.argmax( inside[:, ::-1], axis=1 ), -1 ) # highest containing
+        nxt = np.minimum( k+1, len(percentages)-1 )
+
+        s_k, s_next = np.abs( s[rows, k] ), s[rows, nxt]
+        with np.errstate( divide='ignore', invalid='ignore' ):
+            frac = np.where( nxt > k, s_k / (s_k + s_next), 0 )
+        res = percentages[k] + (percentages[nxt] - percentages[k]) * frac
+        return np.where( k >= 0, res, -1 )
+
+
+if __name__=='__main__':
+    import time
+    t0 = time.perf_counter()
+    classifier = sdf_classifier()
+    print( 'sdf grids ready in ' + str(round(time.perf_counter()-t0, 1)) + ' s' )
+
+    rng = np.random.default_rng( 0 )
+    n = 100000
+    points = np.column_stack( (rng.uniform( -0.2, 1.7, n ), 10**rng.uniform( -1.4, 0.8, n ), 10**rng.uniform( 0.2, 1.8, n )) )
+
+    t0 = time.perf_counter()
+    scores = classifier.score( points )
+    print( str(n) + ' points in ' + str(round(time.perf_counter()-t0, 2)) + ' s' )
+    print( np.round( scores[:10], 1 ) )
+    print( classifier.classifier.classify_points( points[:10] ) )
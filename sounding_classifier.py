@@ -0,0 +1,79 @@
+import numpy as np
+from itertools import islice
+
+from voxel_grid import voxel_classifier
+
+'''
+    Sensitivity log for CPTu soundings from the 2025 polyhedron model
+
+    Raw readings (D, QT, FS, U2, U0, Sig_V, Sig_V_eff, as in studies.py, kPa) are converted to
+    the model axes as in study_loader:
+        qn = QT - Sig_V,  Bq = (U2 - U0)/qn,  Fr = FS/qn * 100 (%),  Qt = qn/Sig_V_eff
+    and each depth gets the highest percentage of the polyhedra containing it (-1 for none,
+    or where qn <= 0).
+
+    Soundings are processed chunk_size readings at a time, so memory use only depends on the
+    chunk size: columns may be np.memmap arrays, and read_rows() chunks any row iterator
+    (e.g. a csv.reader) without holding the sounding.
+
+    usage:
+        classifier = voxel_classifier()
+        percentages = classify_sounding( STUDY4[0], classifier )
+        for d, percentages in classify_chunks( read_rows(rows), classifier ): ...
+'''
+
+raw_vars = [ 'D', 'QT', 'FS', 'U2', 'U0', 'Sig_V', 'Sig_V_eff' ]
+chunk_size = 1 << 16
+
+
+def model_coords( qt, fs, u2, u0, sig_v, sig_v_eff ):
+    # raw readings -> (n,3) array of (Bq, Fr, Qt)
+    with np.errstate( divide='ignore', invalid='ignore' ):
+        qn = np.asarray( qt, dtype=np.float64 ) - sig_v
+        qn = np.where( qn > 0, qn, np.nan )
+        return np.column_stack( ( (np.asarray(u2)-u0)/qn, np.asarray(fs)/qn*100, qn/sig_v_eff ) )
+
+
+def iter_chunks( sounding, chunk_size=chunk_size ):
+    # dict of equal length columns (lists, arrays or memmaps) -> dicts of chunk_size rows
+    n = len( sounding['D'] )
+    for start in range( 0, n, chunk_size ):
+        yield { var: np.asarray( sounding[var][ start:start+chunk_size ], dtype=np.float64 ) for var in raw_vars }
+
+
+def read_rows( rows, chunk_size=chunk_size, columns=raw_vars ):
+    # iterator of rows with the values of columns -> dicts of chunk_size rows
+    rows = iter( rows )
+    while True:
+        block = np.array( list( islice(rows, chunk_size) ), dtype=np.float64 ).reshape( -1, len(columns) )
+        if len( block ) == 0: return
+        yield { var: block[:, i] for i, var in enumerate(columns) }
+
+
+def classify_chunks( chunks, classifier ):
+    # yields (depths, percentages) per chunk
+    for chunk in chunks:
+        coords = model_coords( *[ chunk[var] for var in raw_vars[1:] ] )
+        yield chunk['D'], classifier.classify_points( coords )
+
+
+def classify_sounding( sounding, classifier=None, chunk_size=chunk_size, out=None ):
+    # per-depth percentage array for a dict of columns, out may be a preallocated array/memmap
+    classifier = voxel_classifier() if classifier is None else classifier
+    if out is None: out = np.empty( len(sounding['D']), dtype=np.int8 )
+
+    start = 0
+    for _, percentages in classify_chunks( iter_chunks(sounding, chunk_size), classifier ):
+        out[ start:start+len(percentages) ] = percentages
+        start += len( percentages )
+    return out
+
+
+if __name__=='__main__':
+    from studies import STUDY4
+    classifier = voxel_classifier()
+
+    for soil_type in STUDY4:
+        percentages = classify_sounding( soil_type, classifier )
+        values, counts = np.unique( percentages, return_counts=True )
+        print( soil_type['name'] + ': ' + str(len(percentages)) + ' readings, ' + str( dict(zip(values.tolist(), counts.tolist())) ) )
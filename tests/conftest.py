@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+# modules live in the repository root
+root = os.path.dirname( os.path.dirname( os.path.abspath(__file__) ) )
+sys.path.insert( 0, root )
+
+
+@pytest.fixture( scope='session' )
+def in_root( tmp_path_factory ):
+    # runs from the repository root (model files are read relative to it), caches in a temporary folder
+    import mesh_bvh, voxel_grid, sbt_raster, sdf_grid
+    saves = str( tmp_path_factory.mktemp('saves') )
+    cwd = os.getcwd()
+    os.chdir( root )
+    for module in ( mesh_bvh, voxel_grid, sbt_raster, sdf_grid ):
+        module.saves_folder = saves
+    yield saves
+    os.chdir( cwd )
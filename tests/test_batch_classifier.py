@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+import batch_classifier
+from sounding_classifier import raw_vars
+
+shm_dir = '/dev/shm'
+pytestmark = pytest.mark.skipif( not os.path.isdir(shm_dir), reason='lists shared memory blocks in /dev/shm' )
+
+
+def write_csv( path, columns, rows ):
+    with open( path, 'w' ) as f:
+        f.write( ','.join( columns ) + '\n' )
+        for row in rows: f.write( ','.join( str(v) for v in row ) + '\n' )
+
+
+def test_failed_file_frees_shared_memory( in_root, tmp_path ):
+    write_csv( tmp_path / 'a.csv', raw_vars, [ [1, 500, 5, 100, 10, 20, 10], [2, 600, 6, 120, 20, 40, 20] ] )
+    write_csv( tmp_path / 'b.csv', raw_vars[:-1], [ [1, 500, 5, 100, 10, 20] ] )
+    before = set( os.listdir(shm_dir) )
+    with pytest.raises( ValueError ):
+        batch_classifier.run_batch( str(tmp_path), str(tmp_path / 'log.npz'), workers=2 )
+    assert set( os.listdir(shm_dir) ) <= before
+
+
+def test_failed_share_frees_shared_memory( in_root, tmp_path, monkeypatch ):
+    calls = []
+    def failing_to_shared( arr ):
+        calls.append( arr )
+        if len( calls ) == 5: raise OSError( 'no space left for shared memory' )
+        return to_shared( arr )
+    to_shared = batch_classifier.to_shared
+    monkeypatch.setattr( batch_classifier, 'to_shared', failing_to_shared )
+
+    before = set( os.listdir(shm_dir) )
+    with pytest.raises( OSError ):
+        batch_classifier.run_batch( str(tmp_path), str(tmp_path / 'log.npz'), workers=2 )
+    assert set( os.listdir(shm_dir) ) <= before
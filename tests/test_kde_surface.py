@@ -0,0 +1,76 @@
+import os
+import numpy as np
+import pytest
+
+import kde_surface
+from study_loader import study_loader
+
+
+@pytest.fixture( scope='module' )
+def loader():
+    d_loader = study_loader( study_nr=3 )
+    d_loader.fit( ['BQ','FR','QQT'] )
+    return d_loader
+
+
+@pytest.mark.parametrize( 'backend', ['truncate', 'fft', ''] )
+def test_unknown_backend_raises( loader, backend ):
+    with pytest.raises( ValueError ):
+        kde_surface.gen_kdes( loader.data(), N=5, backend=backend )
+    with pytest.raises( ValueError ):
+        kde_surface.get_kdes( loader, 5, backend=backend )
+
+
+@pytest.mark.parametrize( 'memory_limit', [4<<20, 16<<20, 64<<20] )
+def test_binned_blocks_within_memory_limit( loader, memory_limit ):
+    import tracemalloc
+    kernel = kde_surface.fit_kernel( loader.data()[1] )
+    mgrid_def = [-10, 10, -10, 10, -10, 10, 100]
+    whole = kde_surface.binned_kde_grid( kernel, mgrid_def, memory_limit=1<<30 )
+
+    out = np.empty_like( whole ) # not part of the working memory
+    tracemalloc.start()
+    try:
+        kde_surface.binned_kde_grid( kernel, mgrid_def, out, memory_limit=memory_limit )
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= memory_limit
+    np.testing.assert_allclose( out, whole, rtol=0, atol=1e-12*whole.max() )
+
+
+def test_binned_memory_limit_too_small( loader ):
+    kernel = kde_surface.fit_kernel( loader.data()[1] )
+    with pytest.raises( ValueError ):
+        kde_surface.binned_kde_grid( kernel, [-10, 10, -10, 10, -10, 10, 60], memory_limit=1<<16 )
+
+
+def test_release_grids_drops_memmaps( loader, tmp_path ):
+    import weakref
+    kdes = kde_surface.gen_kdes( loader.data(), N=5, memmap_dir=str(tmp_path) )
+    refs = [ weakref.ref( kde[2] ) for kde in kdes ]
+    files = kde_surface.release_grids( kdes )
+    del kdes
+    assert all( ref() is None for ref in refs )
+    assert sorted( files ) == sorted( f for f in os.listdir(tmp_path) if f.endswith('.npy') )
+
+
+def test_callable_bw_method_skips_cache( loader, tmp_path, monkeypatch ):
+    monkeypatch.setattr( kde_surface, 'kde_cache_folder', str(tmp_path / 'kde_cache') )
+    kdes = kde_surface.get_kdes( loader, 5, workers=1, bw_method=lambda kde: 0.3 )
+    assert not os.path.exists( kde_surface.kde_cache_folder )
+    ref = kde_surface.get_kdes( loader, 5, workers=1, bw_method=0.3 )
+    assert len( os.listdir(kde_surface.kde_cache_folder) ) == 1
+    for kde, kde_ref in zip( kdes, ref ):
+        np.testing.assert_allclose( kde[2], kde_ref[2] )
+
+
+def test_parallel_in_memory_matches_serial( loader ):
+    before = set( os.listdir('/dev/shm') ) if os.path.isdir( '/dev/shm' ) else set()
+    serial = kde_surface.gen_kdes( loader.data(), N=12, workers=1 )
+    parallel = kde_surface.gen_kdes( loader.data(), N=12, workers=2 )
+    for kde, kde_ref in zip( parallel, serial ):
+        assert type( kde[2] ) is np.ndarray and kde[2].flags.writeable
+        np.testing.assert_array_equal( kde[2], kde_ref[2] )
+        assert kde[3] == kde_ref[3]
+    if os.path.isdir( '/dev/shm' ): assert set( os.listdir('/dev/shm') ) <= before
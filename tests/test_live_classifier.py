@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from sounding_classifier import raw_vars
+from studies import STUDY4
+
+
+@pytest.fixture( scope='module' )
+def classifier( in_root ):
+    from live_classifier import live_classifier
+    return live_classifier()
+
+
+@pytest.mark.parametrize( 'thickness', [0.1, 0.2, 0.5] )
+def test_add_and_add_batch_give_same_layers( classifier, thickness ):
+    from live_classifier import live_sounding
+    soil_type = STUDY4[0]
+    readings = list( zip( *[ soil_type[var] for var in raw_vars ] ) )
+
+    single = live_sounding( classifier, layer_thickness=thickness )
+    for reading in readings:
+        single.add( *reading )
+
+    batch = live_sounding( classifier, layer_thickness=thickness )
+    for start in range( 0, len(readings), 25 ):
+        batch.add_batch( { var: np.asarray( soil_type[var][start:start+25], dtype=np.float64 ) for var in raw_vars } )
+
+    assert sorted( single.layers ) == sorted( batch.layers )
+    for i in single.layers:
+        a, b = single.layers[i], batch.layers[i]
+        assert a.n == b.n
+        np.testing.assert_allclose( a.mean, b.mean, rtol=1e-9, atol=1e-12 )
+        np.testing.assert_allclose( a.std(), b.std(), rtol=1e-7, atol=1e-12 )
+    assert single.percentages == batch.percentages
+    assert single.regions == batch.regions
+
+
+def test_single_readings_match_batch( classifier ):
+    rng = np.random.default_rng( 0 )
+    n = 2000
+    sig_v = rng.uniform( 20, 300, n )
+    chunk = { 'D': np.arange(n)*0.02, 'Sig_V': sig_v, 'Sig_V_eff': sig_v*rng.uniform(0.4, 0.9, n), 'U0': sig_v*0.5 }
+    chunk['QT'] = sig_v + 10**rng.uniform( 0.5, 2.5, n )
+    qn = chunk['QT'] - sig_v
+    chunk['FS'] = qn * 10**rng.uniform( -1.4, 1, n ) / 100
+    chunk['U2'] = chunk['U0'] + qn*rng.uniform( -0.3, 1.6, n )
+
+    _, percentages, regions = classifier.classify_batch( chunk )
+    for i in range( n ):
+        _, percentage, region = classifier.classify_reading( *[ chunk[var][i] for var in raw_vars[1:] ] )
+        assert percentage == percentages[i]
+        assert all( region[name] == regions[name][i] for name in regions )
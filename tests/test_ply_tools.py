@@ -0,0 +1,28 @@
+import os
+
+import numpy as np
+import pytest
+
+import ply_tools
+from plyfile import PlyElementParseError
+
+files = [ 'Valsson2013.ply', 'Valsson2016.ply', '2025_model_restored/050p_a.ply' ]
+
+
+def test_process_pool_matches_serial( in_root ):
+    shared = ply_tools.load_plys( files, pool='process', workers=2 )[0]
+    serial = ply_tools.load_plys( files, pool='serial' )[0]
+    for (v0, f0, c0), (v1, f1, c1) in zip( shared, serial ):
+        np.testing.assert_array_equal( v0, v1 )
+        np.testing.assert_array_equal( f0, f1 )
+        assert c0 == c1
+
+
+@pytest.mark.skipif( not os.path.isdir('/dev/shm'), reason='lists shared memory blocks in /dev/shm' )
+def test_failed_file_frees_shared_memory( in_root, tmp_path ):
+    bad = tmp_path / 'bad.ply'
+    bad.write_text( 'ply\nformat ascii 1.0\nelement vertex 3\nproperty float x\nend_header\n1\n' )
+    before = set( os.listdir('/dev/shm') )
+    with pytest.raises( PlyElementParseError ):
+        ply_tools.load_plys( files + [ str(bad) ] + files, pool='process', workers=2 )
+    assert set( os.listdir('/dev/shm') ) <= before
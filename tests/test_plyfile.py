@@ -0,0 +1,182 @@
+import numpy as np
+import pytest
+
+from plyfile import PlyData, PlyElement, PlyChunkReader, PlyChunkWriter, PlyElementParseError
+
+
+def make_vertices( n=10 ):
+    rng = np.random.default_rng( 0 )
+    vertex = np.empty( n, dtype=[('x', 'f4'), ('y', 'f4'), ('z', 'f8'), ('red', 'u1')] )
+    vertex['x'], vertex['y'], vertex['z'] = rng.random( n ), rng.random( n ), rng.random( n )
+    vertex['red'] = rng.integers( 0, 256, n )
+    return vertex
+
+
+def make_faces( rows ):
+    face = np.empty( len(rows), dtype=[('vertex_indices', 'O'), ('flag', 'i2')] )
+    face['vertex_indices'] = [ np.array( row, dtype=np.int32 ) for row in rows ]
+    face['flag'] = np.arange( len(rows) )
+    return face
+
+
+triangles = [ [0, 1, 2], [2, 3, 4], [5, 6, 7] ]
+mixed = [ [0, 1, 2], [2, 3, 4, 5], [6, 7, 8, 9, 0], [1, 2, 3] ]
+formats = [ (True, '='), (False, '<'), (False, '>') ]
+
+
+def write_ply( path, vertex, rows, text, byte_order ):
+    elements = [ PlyElement.describe( vertex, 'vertex' ),
+                 PlyElement.describe( make_faces(rows), 'face', len_types={'vertex_indices': 'u1'} ) ]
+    PlyData( elements, text=text, byte_order=byte_order, comments=['x(Bq) y(Fr) z(Qt)'] ).write( str(path) )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+@pytest.mark.parametrize( 'mmap', [False, 'c'] )
+def test_round_trip( tmp_path, text, byte_order, mmap ):
+    vertex, path = make_vertices(), tmp_path / 'mesh.ply'
+    write_ply( path, vertex, mixed, text, byte_order )
+
+    data = PlyData.read( str(path), mmap=mmap )
+    assert data.text == text
+    assert data.comments == ['x(Bq) y(Fr) z(Qt)']
+    for name in vertex.dtype.names:
+        np.testing.assert_array_equal( data['vertex'][name], vertex[name] )
+    for row, read in zip( mixed, data['face']['vertex_indices'] ):
+        np.testing.assert_array_equal( read, row )
+    np.testing.assert_array_equal( data['face']['flag'], np.arange(len(mixed)) )
+
+
+def truncate( path, keep ):
+    raw = path.read_bytes()
+    path.write_bytes( raw[ :len(raw)-keep ] )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+@pytest.mark.parametrize( 'rows', [triangles, mixed] )
+@pytest.mark.parametrize( 'mmap', [False, 'c'] )
+def test_truncated_faces( tmp_path, text, byte_order, rows, mmap ):
+    path = tmp_path / 'mesh.ply'
+    write_ply( path, make_vertices(), rows, text, byte_order )
+    truncate( path, 12 if text else 5 ) # into the last face
+    with pytest.raises( PlyElementParseError ):
+        PlyData.read( str(path), mmap=mmap )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+@pytest.mark.parametrize( 'mmap', [False, 'c'] )
+def test_truncated_vertices( tmp_path, text, byte_order, mmap ):
+    vertex, path = make_vertices(), tmp_path / 'cloud.ply'
+    PlyData( [PlyElement.describe( vertex, 'vertex' )], text=text, byte_order=byte_order ).write( str(path) )
+    truncate( path, 30 )
+    with pytest.raises( PlyElementParseError ):
+        PlyData.read( str(path), mmap=mmap )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+def test_read_arrays_fixed_faces( tmp_path, text, byte_order ):
+    vertex, path = make_vertices(), tmp_path / 'mesh.ply'
+    write_ply( path, vertex, triangles, text, byte_order )
+
+    vertices, faces, data = PlyData.read_arrays( str(path) )
+    assert vertices.shape == (len(vertex), 3)
+    np.testing.assert_array_equal( vertices, np.column_stack( [vertex['x'], vertex['y'], vertex['z']] ) )
+    assert faces.shape == (len(triangles), 3)
+    np.testing.assert_array_equal( faces, triangles )
+    assert data.comments == ['x(Bq) y(Fr) z(Qt)']
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+def test_read_arrays_csr_faces( tmp_path, text, byte_order ):
+    vertex, path = make_vertices(), tmp_path / 'mesh.ply'
+    write_ply( path, vertex, mixed, text, byte_order )
+
+    offsets, indices = PlyData.read_arrays( str(path) )[1]
+    np.testing.assert_array_equal( offsets, np.cumsum( [0] + [ len(row) for row in mixed ] ) )
+    for i, row in enumerate( mixed ):
+        np.testing.assert_array_equal( indices[ offsets[i]:offsets[i+1] ], row )
+
+
+def test_read_arrays_without_faces( tmp_path ):
+    vertex, path = make_vertices(), tmp_path / 'cloud.ply'
+    PlyData( [PlyElement.describe( vertex, 'vertex' )] ).write( str(path) )
+    vertices, faces, _ = PlyData.read_arrays( str(path), vertex_props=('x', 'red') )
+    assert faces is None
+    np.testing.assert_array_equal( vertices, np.column_stack( [vertex['x'], vertex['red']] ) )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+@pytest.mark.parametrize( 'rows', [triangles, mixed] )
+@pytest.mark.parametrize( 'mmap', [False, 'c'] )
+def test_read_arrays_truncated( tmp_path, text, byte_order, rows, mmap ):
+    path = tmp_path / 'mesh.ply'
+    write_ply( path, make_vertices(), rows, text, byte_order )
+    truncate( path, 12 if text else 5 ) # into the last face
+    with pytest.raises( PlyElementParseError ):
+        PlyData.read_arrays( str(path), mmap=mmap )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+def test_chunk_reader( tmp_path, text, byte_order ):
+    vertex, path = make_vertices( 25 ), tmp_path / 'mesh.ply'
+    write_ply( path, vertex, mixed, text, byte_order )
+
+    with PlyChunkReader( str(path), chunk_size=4 ) as reader:
+        chunks = list( reader.chunks('vertex') )
+        assert [ len(chunk) for chunk in chunks ] == [4]*6 + [1]
+        np.testing.assert_array_equal( np.concatenate( chunks )['z'], vertex['z'] )
+        faces = np.concatenate( list( reader.chunks('face') ) )
+        for row, read in zip( mixed, faces['vertex_indices'] ):
+            np.testing.assert_array_equal( read, row )
+        with pytest.raises( ValueError ):
+            next( reader.chunks('vertex') )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+def test_chunk_reader_skips_to_element( tmp_path, text, byte_order ):
+    vertex, path = make_vertices( 25 ), tmp_path / 'mesh.ply'
+    write_ply( path, vertex, mixed, text, byte_order )
+    with PlyChunkReader( str(path), chunk_size=3 ) as reader:
+        flags = np.concatenate( list( reader.chunks('face') ) )['flag']
+    np.testing.assert_array_equal( flags, np.arange(len(mixed)) )
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+def test_truncated_chunks( tmp_path, text, byte_order ):
+    path = tmp_path / 'mesh.ply'
+    write_ply( path, make_vertices( 25 ), mixed, text, byte_order )
+    truncate( path, 12 if text else 5 )
+    with PlyChunkReader( str(path), chunk_size=4 ) as reader:
+        with pytest.raises( PlyElementParseError ):
+            for _ in reader: pass
+
+
+@pytest.mark.parametrize( 'text, byte_order', formats )
+def test_chunk_writer_patches_count( tmp_path, text, byte_order ):
+    vertex, path = make_vertices( 25 ), tmp_path / 'cloud.ply'
+    with PlyChunkWriter( str(path), vertex.dtype, text=text, byte_order=byte_order, comments=['chunked'] ) as writer:
+        for start in range( 0, len(vertex), 7 ):
+            writer.write( vertex[ start:start+7 ] )
+        assert writer.count == len( vertex )
+
+    header = PlyData.read_header( str(path) )
+    assert header['vertex'].count == len( vertex )
+    assert header.comments == ['chunked']
+    data = PlyData.read( str(path) )
+    for name in vertex.dtype.names:
+        np.testing.assert_array_equal( data['vertex'][name], vertex[name] )
+
+
+def test_chunk_writer_empty( tmp_path ):
+    path = tmp_path / 'empty.ply'
+    with PlyChunkWriter( str(path), make_vertices().dtype ):
+        pass
+    assert len( PlyData.read( str(path) )['vertex'].data ) == 0
+
+
+@pytest.mark.parametrize( 'suffix', ['.gz', '.bz2', '.xz'] )
+def test_compressed_round_trip( tmp_path, suffix ):
+    vertex, path = make_vertices(), tmp_path / ('mesh.ply' + suffix)
+    write_ply( path, vertex, triangles, False, '<' )
+    vertices, faces, _ = PlyData.read_arrays( str(path) )
+    np.testing.assert_array_equal( vertices, np.column_stack( [vertex['x'], vertex['y'], vertex['z']] ) )
+    np.testing.assert_array_equal( faces, triangles )
@@ -0,0 +1,17 @@
+import numpy as np
+
+
+def test_score_refines_classify_points( in_root ):
+    # the shell of the score is the one classify_points() gives, also right next to the surfaces
+    from sdf_grid import sdf_classifier
+    classifier = sdf_classifier()
+    lo, hi = np.array( classifier.lims ).T
+    points_ = np.random.default_rng( 1 ).uniform( lo, hi, (20000, 3) )
+    points = np.column_stack( (points_[:, 0], 10**points_[:, 1], 10**points_[:, 2]) )
+
+    scores = classifier.score( points )
+    shells = np.where( scores >= 0, np.floor( scores/10 )*10, -1 ).astype( np.int64 )
+    np.testing.assert_array_equal( shells, classifier.classifier.classify_points( points ) )
+
+    exact = classifier.score( points[:500], exact=True )
+    np.testing.assert_allclose( scores[:500], exact, atol=1 )
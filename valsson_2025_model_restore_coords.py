@@ -76,6 +76,8 @@ def restore():
 
     for file in files:
         modified_ply_data = restore_plydata( file, scale_shift ) # edit vertices
+        modified_ply_data.text = False # binary little endian, see ply_tools.convert_tree()
+        modified_ply_data.byte_order = '<'
 
         # save to file
         new_filename = os.path.join( out_dir, os.path.basename(file) )
@@ -1,6 +1,7 @@
 import numpy as np
 from plyfile import PlyData
 from cptu_classification_models_2d import model_defs
+from sbt_classifier import regions_in_box
 
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
@@ -132,9 +133,7 @@ def prep_mesh( model_nr, logs=None ):
     if logs is None: logs = [False, True, True] # Robertson charts have (Bq, Fr, Qt) in (lin,log,log)
 
     # extract model
-    ply_data = PlyData.read( f_name )
-    vertices = np.array( [list(vertex) for vertex in ply_data['vertex'].data] )
-    faces = np.array( [list(face[0]) for face in ply_data['face'].data] )
+    vertices, faces, ply_data = PlyData.read_arrays( f_name )
 
     # model mesh
     mesh = vert_face_to_mesh( vertices, faces, alpha=0.6, fc=colors[model_nr] )
@@ -160,12 +159,12 @@ def add_reference_models( ax, lims ):
     rob90_bq = model_defs['robertson_90_bq']
     rob90_fr = model_defs['robertson_90_fr']
     
-    for region in rob90_bq['regions']:
+    for region in regions_in_box( 'robertson_90_bq', (lims[0], lims[2]) ): # only regions in view
         x, z = rob90_bq['regions'][region]['xy']
         z = np.log10(z)
         ax.plot( x, [lims[1][0]]*len(x), z, lw=model_lw, c=model_color, zorder=-1)
 
-    for region in rob90_fr['regions']: # repeated code as I'm low on time
+    for region in regions_in_box( 'robertson_90_fr', (lims[1], lims[2]) ): # repeated code as I'm low on time
         y, z = rob90_fr['regions'][region]['xy']
         y, z = np.log10(y), np.log10(z)
         label = ''#'Robertson \'90 SBT charts'
@@ -50,8 +50,7 @@ def c_interp(percentage):
 
 def prep_p_cloud( f_name, logs=[False, True, True] ):
     # extract model
-    ply_data = PlyData.read( f_name )
-    vertices = np.array( [list(vertex) for vertex in ply_data['vertex'].data] )
+    vertices, _, ply_data = PlyData.read_arrays( f_name )
 
     # account for logs
     vertices_ = vertices * 1    
@@ -68,9 +67,7 @@ def prep_p_cloud( f_name, logs=[False, True, True] ):
 
 def prep_mesh( f_name, logs=[False, True, True] ):
     # extract model
-    ply_data = PlyData.read( f_name )
-    vertices = np.array( [list(vertex) for vertex in ply_data['vertex'].data] )
-    faces = np.array( [list(face[0]) for face in ply_data['face'].data] )
+    vertices, faces, ply_data = PlyData.read_arrays( f_name )
 
     model_nr = os.path.basename( f_name ).split('p_')[0]
     model_color = c_interp( float(model_nr)/100 )
@@ -13,6 +13,7 @@ import matplotlib.colors as mcolors
 from valsson_polyhedrons import format_axes, log_tick_formatter, get_axis_labels, get_ax_lims, vert_face_to_mesh, add_reference_models, draw_data
 from valsson_2025_model_restore_coords import files_in_folder, out_dir
 from valsson_polyhedrons_2025_point_clouds import prep_p_cloud
+from sbt_classifier import regions_in_box
 
 '''
     Module presents sensitive material model from 2025 Valsson study using PyVista.
@@ -41,9 +42,7 @@ def c_interp(percentage):
 
 def prep_mesh( f_name, logs=[False, True, True] ):
     # extract model
-    ply_data = PlyData.read( f_name )
-    vertices = np.array( [list(vertex) for vertex in ply_data['vertex'].data] )
-    faces = np.array( [list(face[0]) for face in ply_data['face'].data] )
+    vertices, faces, ply_data = PlyData.read_arrays( f_name )
     var_names = ply_data.comments[2]
 
     model_nr = os.path.basename( f_name ).split('p_')[0]
@@ -193,7 +192,7 @@ def add_reference_models( plotter, meshes ):
     rob90_bq = model_defs['robertson_90_bq']
     rob90_fr = model_defs['robertson_90_fr']
     
-    for region in rob90_bq['regions']:
+    for region in regions_in_box( 'robertson_90_bq', (ax_lims[0], ax_lims[2]) ): # only regions in view
         x, z = rob90_bq['regions'][region]['xy']
         y = [ax_lims[1][0]]*len(x)
         z = np.log10(z)
@@ -203,7 +202,7 @@ def add_reference_models( plotter, meshes ):
     plotter.add_mesh( polyline( pts ), color=model_color, line_width=model_lw, label='Robertson \'90 SBT charts' )
         
 
-    for region in rob90_fr['regions']: # repeated code as I'm low on time        
+    for region in regions_in_box( 'robertson_90_fr', (ax_lims[1], ax_lims[2]) ): # repeated code as I'm low on time        
         y, z = rob90_fr['regions'][region]['xy']
         y, z = np.log10(y), np.log10(z)
         x = [ax_lims[0][0]]*len(y)
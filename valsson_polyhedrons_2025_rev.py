@@ -11,7 +11,9 @@ from cptu_classification_models_2d import model_defs
 import matplotlib.colors as mcolors
 
 from valsson_polyhedrons import format_axes, log_tick_formatter, get_axis_labels, get_ax_lims, vert_face_to_mesh, add_reference_models, draw_data
-from valsson_2025_model_restore_coords import files_in_folder, out_dir
+from valsson_2025_model_restore_coords import out_dir
+from ply_tools import index_dir
+from sbt_classifier import regions_in_box
 
 '''
     Module presents sensitive material model from 2025 Valsson study
@@ -39,9 +41,7 @@ def c_interp(percentage):
 
 def prep_mesh( f_name, logs=[False, True, True] ):
     # extract model
-    ply_data = PlyData.read( f_name )
-    vertices = np.array( [list(vertex) for vertex in ply_data['vertex'].data] )
-    faces = np.array( [list(face[0]) for face in ply_data['face'].data] )
+    vertices, faces, ply_data = PlyData.read_arrays( f_name )
     var_names = ply_data.comments[2]
 
     model_nr = os.path.basename( f_name ).split('p_')[0]
@@ -177,7 +177,7 @@ def add_reference_models( plotter, meshes ):
     rob90_bq = model_defs['robertson_90_bq']
     rob90_fr = model_defs['robertson_90_fr']
     
-    for region in rob90_bq['regions']:
+    for region in regions_in_box( 'robertson_90_bq', (ax_lims[0], ax_lims[2]) ): # only regions in view
         x, z = rob90_bq['regions'][region]['xy']
         y = [ax_lims[1][0]]*len(x)
         z = np.log10(z)
@@ -187,7 +187,7 @@ def add_reference_models( plotter, meshes ):
     plotter.add_mesh( polyline( pts ), color=model_color, line_width=model_lw, label='Robertson \'90 SBT charts' )
         
 
-    for region in rob90_fr['regions']: # repeated code as I'm low on time        
+    for region in regions_in_box( 'robertson_90_fr', (ax_lims[1], ax_lims[2]) ): # repeated code as I'm low on time        
         y, z = rob90_fr['regions'][region]['xy']
         y, z = np.log10(y), np.log10(z)
         x = [ax_lims[0][0]]*len(y)
@@ -215,9 +215,10 @@ def set_view( plotter ):
         plotter.add_key_event("p", my_cpos_callback)
 
 
-def present_model():
-    # load model data & pyvista plotter
-    meshes = [ prep_mesh( f ) for f in files_in_folder( out_dir ) ]
+def present_model( ratios=None ):
+    # pick models from headers only (all by default), then load model data & pyvista plotter
+    models = [ m for m in index_dir( out_dir ) if ratios is None or m['ratio'] in ratios ]
+    meshes = [ prep_mesh( m['path'] ) for m in models ]
     plotter = pv.Plotter( notebook=False )
 
     # construct scene
@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+import numpy as np
+from scipy import ndimage
+
+from polyhedron_classifier import polyhedron_classifier
+from valsson_polyhedrons import get_ax_lims
+
+'''
+    Voxel lookup grid for the 2025 sensitivity model
+
+    The (Bq, log Fr, log Qt) box from get_ax_lims() is split into n^3 voxels, each holding the
+    percentage of the model containing it (-1 for none), or boundary_label if a triangle of any
+    model may pass through it.  A voxel is marked as boundary if it overlaps the bounding box of
+    a triangle (grown by one voxel against rounding), so all other voxels lie entirely within one
+    region.  The regions are the connected components of the non-boundary voxels, so the exact
+    classifier is only run once per region.
+
+    At runtime voxel_classifier does one fancy-index per point and falls back to the exact
+    polyhedron_classifier for boundary voxels and points outside the box.
+
+    get_voxel_grid() saves the grid as saves/voxels_n<n>_<key>.npy (int8) with a .json of its
+    limits, loaded with mmap_mode='r'.  The key is a hash of the model files, limits and n.
+'''
+
+boundary_label = -2
+saves_folder = 'saves'
+
+
+def model_ax_lims( classifier ):
+    return get_ax_lims( classifier.var_names[0] )
+
+
+def voxel_index( points_, lims, n ):
+    # voxel index (k,3) of model coordinates, and a mask of the points inside the grid
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    with np.errstate( invalid='ignore' ):
+        idx = np.floor( (points_ - lo) / (hi - lo) * n )
+        inside = np.all( (idx >= 0) & (idx < n), axis=1 )
+    return np.where( inside[:, None], idx, 0 ).astype( np.int64 ), inside
+
+
+def mark_boundary( grid, tris, lims ):
+    # marks voxels overlapping the (grown) bounding boxes of the triangles (m,3,3), model coordinates
+    n = grid.shape[0]
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    i0 = np.clip( np.floor( (tris.min(axis=1) - lo) / (hi - lo) * n ) - 1, 0, n-1 ).astype( np.int64 )
+    i1 = np.clip( np.floor( (tris.max(axis=1) - lo) / (hi - lo) * n ) + 1, 0, n-1 ).astype( np.int64 )
+
+    # expand every box to its voxels
+    sizes = i1 - i0 + 1
+    counts = np.prod( sizes, axis=1 )
+    tri = np.repeat( np.arange(len(tris)), counts )
+    local = np.arange( counts.sum() ) - np.repeat( np.cumsum(counts)-counts, counts )
+    sx, sy = sizes[tri, 0], sizes[tri, 1]
+    ix = i0[tri, 0] + local % sx
+    iy = i0[tri, 1] + (local // sx) % sy
+    iz = i0[tri, 2] + local // (sx*sy)
+    grid[ ix, iy, iz ] = boundary_label
+
+
+def build_voxel_grid( classifier, lims, n=128 ):
+    grid = np.zeros( (n, n, n), dtype=np.int8 )
+
+    for bvh in classifier.bvhs: # same triangles as the exact test
+        mark_boundary( grid, bvh['tris'], lims )
+
+    # one exact test per connected region of non-boundary voxels
+    regions, n_regions = ndimage.label( grid != boundary_label )
+    first = np.unique( regions.ravel(), return_index=True )[1][1:] # skip region 0 (boundary)
+    centers = np.column_stack( np.unravel_index( first, grid.shape ) ) + 0.5
+
+    lo, hi = np.array( lims, dtype=np.float64 ).T
+    centers_ = lo + centers / n * (hi - lo)
+    centers_raw = centers_ * 1
+    for i, some_log in enumerate( classifier.logs ):
+        if some_log: centers_raw[:, i] = 10**centers_[:, i]
+
+    labels = np.append( boundary_label, classifier.classify_points( centers_raw ) ).astype( np.int8 )
+    return labels[ regions ]
+
+
+def grid_key( classifier, lims, n ):
+    h = hashlib.sha1( str( (lims, n, boundary_label) ).encode() )
+    for bvh in classifier.bvhs:
+        h.update( np.ascontiguousarray( bvh['tris'] ).tobytes() )
+    return h.hexdigest()[:16]
+
+
+def save_voxel_grid( grid, lims, file_path ):
+    np.save( file_path, grid )
+    with open( os.path.splitext(file_path)[0] + '.json', 'w' ) as f:
+        json.dump( { 'lims': [ list(lim) for lim in lims ], 'n': grid.shape[0], 'boundary_label': boundary_label }, f )
+
+
+def load_voxel_grid( file_path ):
+    with open( os.path.splitext(file_path)[0] + '.json' ) as f:
+        meta = json.load( f )
+    return np.load( file_path, mmap_mode='r' ), meta['lims']
+
+
+def get_voxel_grid( classifier, n=128 ):
+    lims = model_ax_lims( classifier )
+    save_name = 'voxels_n' + str(n) + '_' + grid_key( classifier, lims, n ) + '.npy'
+    file_path = os.path.join( saves_folder, save_name )
+
+    if not os.path.isfile( file_path ):
+        os.makedirs( saves_folder, exist_ok=True )
+        save_voxel_grid( build_voxel_grid( classifier, lims, n ), lims, file_path )
+    return load_voxel_grid( file_path )
+
+
+class voxel_classifier():
+    def __init__( self, n=128, classifier=None, grid=None, lims=None ):
+        # grid & lims may be given, e.g. attached from shared memory
+        self.classifier = polyhedron_classifier() if classifier is None else classifier
+        if grid is None:
+            grid, lims = get_voxel_grid( self.classifier, n )
+        self.grid, self.lims = grid, lims
+        self.n = self.grid.shape[0]
+
+
+    def classify_points( self, points ):
+        # as polyhedron_classifier.classify_points(), exact test only for boundary voxels
+        points = np.array( points, dtype=np.float64, ndmin=2 )
+        idx, inside = voxel_index( self.classifier.transform(points), self.lims, self.n )
+
+        res = np.asarray( self.grid[ idx[:, 0], idx[:, 1], idx[:, 2] ], dtype=np.int64 )
+        exact = ~inside | (res == boundary_label)
+        res[ exact ] = self.classifier.classify_points( points[exact] )
+        return res
+
+
+    def boundary_fraction( self ):
+        return np.count_nonzero( np.asarray(self.grid) == boundary_label ) / self.grid.size
+
+
+    def classify( self, bq, fr, qt ):
+        return self.classify_points( np.column_stack( (np.ravel(bq), np.ravel(fr), np.ravel(qt)) ) ).reshape( np.shape(bq) )
+
+
+if __name__=='__main__':
+    import time
+    classifier = voxel_classifier()
+    print( 'boundary voxels: ' + str(round( classifier.boundary_fraction()*100, 1 )) + '%' )
+
+    rng = np.random.default_rng( 0 )
+    n = 100000
+    bq, fr, qt = rng.uniform( -0.2, 1.7, n ), 10**rng.uniform( -1.4, 0.8, n ), 10**rng.uniform( 0.2, 1.8, n )
+
+    t0 = time.perf_counter()
+    res = classifier.classify( bq, fr, qt )
+    print( str(n) + ' points in ' + str(round(time.perf_counter()-t0, 2)) + ' s' )
+    print( dict(zip( *np.unique(res, return_counts=True) )) )